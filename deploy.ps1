@@ -2,7 +2,7 @@
 $PI_USER = "root"
 $PI_HOST = "49.12.32.80"
 $FRONTEND_BUILD_DIR = "./website-frontend/dist"
-$BACKEND_SOURCE_FILE = "./website-backend/main.py"
+$BACKEND_SOURCE_FILES = "./website-backend/*.py"
 $BACKEND_ENV_FILE = "./website-backend/.env"
 $PI_TEMP_DIR = "/tmp/infizity_deploy"
 $PI_WWW_DIR = "/var/www/infizity"
@@ -72,7 +72,7 @@ scp -r "$FRONTEND_BUILD_DIR/*" "${PI_USER}@${PI_HOST}:$PI_TEMP_DIR/"
 
 # 4. Transfer backend files
 Write-Host "Uploading backend files to server..."
-scp "$BACKEND_SOURCE_FILE" "${PI_USER}@${PI_HOST}:$PI_BACKEND_DIR/"
+scp $BACKEND_SOURCE_FILES "${PI_USER}@${PI_HOST}:$PI_BACKEND_DIR/"
 scp "$BACKEND_ENV_FILE" "${PI_USER}@${PI_HOST}:$PI_BACKEND_DIR/"
 
 # 5. Execute remote deployment commands
@@ -14,6 +14,7 @@ CREATE TABLE users (
     password_hash VARCHAR(255) NOT NULL,
     user_type ENUM('tutor', 'student') NOT NULL,
     profile_picture_url TEXT,
+    profile_thumbnail_url TEXT,  -- 128px WebP derivative, see images.py
     balance DECIMAL(10, 2) DEFAULT 0.00,
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
     updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
@@ -25,13 +26,19 @@ CREATE TABLE users (
     hourly_rate DECIMAL(10, 2),
     video_intro_url TEXT,
     verification_status ENUM('unverified', 'verified', 'rejected') DEFAULT 'unverified',
-    rating DECIMAL(3, 2),
+    rating DECIMAL(3, 2) DEFAULT 0.00,  -- never NULL for tutors, keyset pagination relies on it
     total_reviews INT DEFAULT 0,
     email_verification_token VARCHAR(255) UNIQUE,
     token_created_at DATETIME,  -- Added for tracking token generation time
     email_verified_at DATETIME,
     INDEX idx_email_verification_token (email_verification_token),  -- Added for faster lookups
-    INDEX idx_email_verified (email_verified_at)  -- Added for verification queries
+    INDEX idx_email_verified (email_verified_at),  -- Added for verification queries
+    -- /tutors/search filters + keyset sort orders (InnoDB appends id to each)
+    INDEX idx_tutor_search_price (user_type, verification_status, is_active, hourly_rate),
+    INDEX idx_tutor_search_subject_price (user_type, verification_status, is_active, subject, hourly_rate),
+    INDEX idx_tutor_search_rating (user_type, verification_status, is_active, rating),
+    INDEX idx_tutor_search_subject_rating (user_type, verification_status, is_active, subject, rating),
+    INDEX idx_tutor_search_reviews (user_type, verification_status, is_active, total_reviews)
 );
 
 -- CONVERSATIONS table
@@ -42,7 +49,9 @@ CREATE TABLE conversations (
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
     updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     FOREIGN KEY (tutor_id) REFERENCES users(id),
-    FOREIGN KEY (student_id) REFERENCES users(id)
+    FOREIGN KEY (student_id) REFERENCES users(id),
+    INDEX idx_conversations_tutor_updated (tutor_id, updated_at),
+    INDEX idx_conversations_student_updated (student_id, updated_at)
 );
 
 -- MESSAGES table
@@ -54,7 +63,22 @@ CREATE TABLE messages (
     sent_at DATETIME DEFAULT CURRENT_TIMESTAMP,
     is_read BOOLEAN DEFAULT FALSE,
     FOREIGN KEY (conversation_id) REFERENCES conversations(id) ON DELETE CASCADE,
-    FOREIGN KEY (sender_id) REFERENCES users(id)
+    FOREIGN KEY (sender_id) REFERENCES users(id),
+    INDEX idx_messages_conversation_sent (conversation_id, sent_at),
+    INDEX idx_messages_conversation_id (conversation_id, id),  -- keyset pages of history
+    INDEX idx_messages_unread (conversation_id, is_read, sender_id)  -- mark-read / unread recount
+);
+
+-- Inbox summary per conversation, maintained by the backend on every message / read
+-- (existing data: python website-backend/backfill.py conversation-summaries)
+CREATE TABLE conversation_summaries (
+    conversation_id INT PRIMARY KEY,
+    last_message_id INT,
+    last_message_content TEXT,
+    last_message_time DATETIME,
+    tutor_unread INT NOT NULL DEFAULT 0,
+    student_unread INT NOT NULL DEFAULT 0,
+    FOREIGN KEY (conversation_id) REFERENCES conversations(id) ON DELETE CASCADE
 );
 
 CREATE TABLE tutor_availability (
@@ -65,8 +89,32 @@ CREATE TABLE tutor_availability (
     is_available BOOLEAN NOT NULL DEFAULT true,
     CONSTRAINT unique_tutor_time_slot UNIQUE (tutor_id, day_of_week, time_slot)
 );
+-- Weekly availability as 336-bit masks (7 days x 48 half-hour slots, bit = day * 48 + slot);
+-- tutor_availability rows are kept in step for reporting
+CREATE TABLE tutor_week_availability (
+    tutor_id INT PRIMARY KEY,
+    offered BINARY(42) NOT NULL,
+    booked BINARY(42) NOT NULL,
+    version INT NOT NULL DEFAULT 0,
+    FOREIGN KEY (tutor_id) REFERENCES users(id) ON DELETE CASCADE
+);
+-- A weekly lesson; its occurrences are bookings rows generated a few weeks ahead
+CREATE TABLE lesson_series (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    tutor_id INT NOT NULL,
+    student_id INT NOT NULL,
+    day_of_week INT NOT NULL,
+    time_slot INT NOT NULL,
+    duration INT NOT NULL,
+    generated_until DATETIME NOT NULL,
+    active BOOLEAN NOT NULL DEFAULT TRUE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (tutor_id) REFERENCES users(id),
+    FOREIGN KEY (student_id) REFERENCES users(id)
+);
 CREATE TABLE bookings (
     id INT AUTO_INCREMENT PRIMARY KEY,
+    series_id INT NULL,
     tutor_id INT,
     student_id INT,
     day_of_week INT,
@@ -75,6 +123,15 @@ CREATE TABLE bookings (
     scheduled_at DATETIME,
     active BOOLEAN NOT NULL DEFAULT TRUE,
     status ENUM('pending', 'completed', 'cancelled') DEFAULT 'pending',
+    -- duration counts 30-minute slots; stored so expiry can range-scan it
+    ends_at DATETIME AS (scheduled_at + INTERVAL duration * 30 MINUTE) STORED,
+    INDEX idx_bookings_active_ends (active, ends_at),
+    INDEX idx_bookings_student_next (student_id, active, scheduled_at),
+    INDEX idx_bookings_tutor_next (tutor_id, active, scheduled_at),
+    INDEX idx_bookings_student_ends (student_id, active, ends_at),
+    INDEX idx_bookings_tutor_ends (tutor_id, active, ends_at),
+    UNIQUE KEY uq_bookings_series_occurrence (series_id, scheduled_at),
+    FOREIGN KEY (series_id) REFERENCES lesson_series(id),
     FOREIGN KEY (tutor_id) REFERENCES users(id),
     FOREIGN KEY (student_id) REFERENCES users(id)
 );
@@ -82,9 +139,33 @@ CREATE TABLE jitsi_rooms (
   id BIGINT UNSIGNED AUTO_INCREMENT PRIMARY KEY,
   booking_id INT NOT NULL UNIQUE,
   room_name VARCHAR(255) NOT NULL,
-  jwt_token TEXT NOT NULL,
   created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
   FOREIGN KEY (booking_id) REFERENCES bookings(id) ON DELETE CASCADE
 );
 
-SELECT * FROM users;
\ No newline at end of file
+-- Outbound email queue, drained by the API's email workers
+CREATE TABLE email_outbox (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    recipient VARCHAR(255) NOT NULL,
+    template VARCHAR(50) NOT NULL,
+    params JSON NOT NULL,
+    status ENUM('pending', 'sent', 'failed') NOT NULL DEFAULT 'pending',
+    attempts INT NOT NULL DEFAULT 0,
+    next_attempt_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    last_error TEXT,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    sent_at DATETIME NULL,
+    INDEX idx_email_outbox_due (status, next_attempt_at),
+    INDEX idx_email_outbox_recipient (recipient, status, sent_at)
+);
+
+-- Reference counts of content-addressed uploads (see website-backend/blobstore.py)
+CREATE TABLE upload_blobs (
+    name VARCHAR(100) PRIMARY KEY,  -- path below uploads/, e.g. ab/cd/<sha256>.jpg
+    refs INT NOT NULL DEFAULT 0,
+    released_at DATETIME NULL,  -- set when refs drops to 0; garbage collected after a grace period
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_upload_blobs_released (released_at)
+);
+
+SELECT * FROM users;
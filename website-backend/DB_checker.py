@@ -1,6 +1,33 @@
+"""Lesson expiry job runner.
+
+Completes bookings whose end time has passed, frees the slots of one-off
+lessons and keeps weekly lesson series materialized SERIES_HORIZON_WEEKS
+ahead. Each chunk of expired bookings is handled by a fixed number of
+set-based statements in its own transaction. The API runs complete_bookings in-process (see
+LessonExpiryScheduler in main.py); this script is the standalone fallback.
+
+With PUBSUB_URL set, the users of completed bookings are published on the
+API's lessons:user Redis channel, so every worker drops their lesson
+snapshots and pushes lessons_updated to their sockets. Without it (a single
+worker on in-process pub/sub) nothing reaches the API, and clients see
+completions only once LESSON_CACHE_TTL expires their snapshots.
+
+    python DB_checker.py --once      # single pass, e.g. from cron
+    python DB_checker.py --daemon    # pass every half hour
+"""
+import argparse
+import os
 import time
 import mysql.connector
 from datetime import datetime, timedelta
+from dotenv import load_dotenv
+
+import availability
+
+try:
+    import redis
+except ImportError:  # only needed with PUBSUB_URL
+    redis = None
 
 DB_CONFIG = {
     'host': 'localhost',
@@ -10,29 +37,215 @@ DB_CONFIG = {
     'use_pure': True
 }
 
-def update_expired_bookings():
+CHUNK_SIZE = 500
+SERIES_HORIZON_WEEKS = 8  # weekly lessons have their occurrences materialized this far ahead
+LESSONS_CHANNEL = "lessons:user"  # payload: id of a user whose bookings changed
+
+
+def insert_occurrences(cursor, rows) -> int:
+    """Bulk-inserts (series_id, tutor_id, student_id, day_of_week, duration, scheduled_at) rows.
+
+    Existing occurrences are left alone (unique series_id + scheduled_at), so
+    generation can be repeated. Returns the id of the first inserted row.
+    """
+    first_id = 0
+    for i in range(0, len(rows), CHUNK_SIZE):
+        chunk = rows[i:i + CHUNK_SIZE]
+        values = ", ".join(["(%s, %s, %s, %s, %s, 'weekly', %s)"] * len(chunk))
+        cursor.execute(f"""
+            INSERT INTO bookings (series_id, tutor_id, student_id, day_of_week, duration, frequency, scheduled_at)
+            VALUES {values}
+            ON DUPLICATE KEY UPDATE series_id = series_id
+        """, [value for row in chunk for value in row])
+        first_id = first_id or cursor.lastrowid
+    return first_id
+
+
+def create_series(cursor, tutor_id, student_id, day_of_week, time_slot, duration, first_at: datetime) -> int:
+    """Starts a weekly lesson; returns the id of its first occurrence."""
+    occurrences = [first_at + timedelta(weeks=week) for week in range(SERIES_HORIZON_WEEKS)]
+    cursor.execute("""
+        INSERT INTO lesson_series (tutor_id, student_id, day_of_week, time_slot, duration, generated_until)
+        VALUES (%s, %s, %s, %s, %s, %s)
+    """, (tutor_id, student_id, day_of_week, time_slot, duration, occurrences[-1]))
+    series_id = cursor.lastrowid
+    return insert_occurrences(
+        cursor, [(series_id, tutor_id, student_id, day_of_week, duration, at) for at in occurrences]
+    )
+
+
+def extend_series(cursor, series_ids) -> int:
+    """Tops active series up to the horizon; returns the number of occurrences generated."""
+    if not series_ids:
+        return 0
+    placeholders = ", ".join(["%s"] * len(series_ids))
+    cursor.execute(f"""
+        SELECT id, tutor_id, student_id, day_of_week, duration, generated_until
+        FROM lesson_series
+        WHERE id IN ({placeholders}) AND active = TRUE
+    """, list(series_ids))
+    until = datetime.now() + timedelta(weeks=SERIES_HORIZON_WEEKS)
+    rows = []
+    for series in cursor.fetchall():
+        at = series["generated_until"] + timedelta(weeks=1)
+        while at <= until:
+            rows.append((series["id"], series["tutor_id"], series["student_id"], series["day_of_week"], series["duration"], at))
+            at += timedelta(weeks=1)
+    if not rows:
+        return 0
+    insert_occurrences(cursor, rows)
+    cursor.execute(f"""
+        UPDATE lesson_series s
+        SET generated_until = (SELECT MAX(b.scheduled_at) FROM bookings b WHERE b.series_id = s.id)
+        WHERE s.id IN ({placeholders})
+    """, list(series_ids))
+    return len(rows)
+
+
+def complete_bookings(conn, booking_ids, affected_users: set = None) -> dict:
+    """Completes the given bookings if they are still active and have ended.
+
+    Rows are locked with SKIP LOCKED, so concurrent runners split the work
+    and a booking is never completed twice. Tutor and student ids of the
+    completed bookings are added to affected_users when it is given.
+    """
+    cursor = conn.cursor(dictionary=True)
+    counts = {"completed": 0, "recurring": 0, "slots_freed": 0}
     try:
-        conn = mysql.connector.connect(**DB_CONFIG)
-        cursor = conn.cursor()
-
-        query = """
-        UPDATE bookings
-        SET active = FALSE
-        WHERE active = TRUE
-          AND NOW() >= DATE_ADD(scheduled_at, INTERVAL duration MINUTE)
-        """
-        cursor.execute(query)
+        placeholders = ", ".join(["%s"] * len(booking_ids))
+        cursor.execute(f"""
+            SELECT id, series_id, tutor_id, student_id, day_of_week, scheduled_at, duration, frequency
+            FROM bookings
+            WHERE id IN ({placeholders}) AND active = TRUE AND ends_at <= NOW()
+            FOR UPDATE SKIP LOCKED
+        """, list(booking_ids))
+        rows = cursor.fetchall()
+        if not rows:
+            conn.commit()
+            return counts
+
+        # Mark as inactive and completed
+        ids = [row["id"] for row in rows]
+        cursor.execute(
+            f"UPDATE bookings SET active = FALSE, status = 'completed' WHERE id IN ({', '.join(['%s'] * len(ids))})",
+            ids
+        )
+        counts["completed"] = cursor.rowcount
+
+        # Weekly lessons keep their slots booked; their series is topped up to the horizon
+        series_ids = {row["series_id"] for row in rows if row["series_id"]}
+        counts["recurring"] = extend_series(cursor, series_ids)
+
+        # Weekly bookings from before lesson_series existed continue row by row
+        # until backfill.py lesson-series converts them
+        legacy_weekly = [row["id"] for row in rows if row["frequency"] == "weekly" and not row["series_id"]]
+        if legacy_weekly:
+            cursor.execute(f"""
+                INSERT INTO bookings (tutor_id, student_id, day_of_week, scheduled_at, duration, frequency)
+                SELECT tutor_id, student_id, day_of_week, scheduled_at + INTERVAL 1 WEEK, duration, frequency
+                FROM bookings
+                WHERE id IN ({", ".join(["%s"] * len(legacy_weekly))})
+            """, legacy_weekly)
+            counts["recurring"] += cursor.rowcount
+
+        # One-off lessons free their slots (duration counts 30-minute slots)
+        masks = {}
+        slots = []
+        for row in rows:
+            if row["frequency"] != "once":
+                continue
+            start_slot = row["scheduled_at"].hour * 2 + row["scheduled_at"].minute // 30
+            mask = availability.WeeklyBitmap.from_range(row["day_of_week"], start_slot, row["duration"])
+            masks.setdefault(row["tutor_id"], availability.WeeklyBitmap()).set(mask)
+            slots += [(row["tutor_id"], row["day_of_week"], slot) for slot in range(start_slot, start_slot + row["duration"])]
+        availability.release_many(cursor, masks)
+        availability.free_slot_rows(cursor, slots)
+        counts["slots_freed"] = len(slots)
+
         conn.commit()
+        if affected_users is not None:
+            affected_users.update(row[key] for row in rows for key in ("tutor_id", "student_id"))
+        return counts
+    except mysql.connector.Error:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+# Served by idx_bookings_active_ends
+EXPIRED_BOOKINGS_QUERY = """
+    SELECT id FROM bookings
+    WHERE active = TRUE AND ends_at <= NOW()
+    ORDER BY ends_at
+    LIMIT %s
+"""
+
+
+def expire_ended_bookings(conn, chunk_size: int = CHUNK_SIZE, affected_users: set = None) -> dict:
+    """Completes every ended booking, chunk_size per transaction; see complete_bookings for affected_users."""
+    started = time.perf_counter()
+    totals = {"completed": 0, "recurring": 0, "slots_freed": 0, "chunks": 0}
+    cursor = conn.cursor()
+    try:
+        while True:
+            cursor.execute(EXPIRED_BOOKINGS_QUERY, (chunk_size,))
+            ids = [row[0] for row in cursor.fetchall()]
+            conn.commit()
+            if not ids:
+                break
+            counts = complete_bookings(conn, ids, affected_users)
+            for key, value in counts.items():
+                totals[key] += value
+            totals["chunks"] += 1
+            if not counts["completed"]:
+                break  # the rest is locked by another runner
+    finally:
+        cursor.close()
+    totals["seconds"] = round(time.perf_counter() - started, 3)
+    return totals
+
 
-        print(f"[{datetime.now()}] Updated expired bookings.")
+def lessons_publisher():
+    """Redis client for the API's pub/sub, or None when PUBSUB_URL is not set."""
+    url = os.getenv("PUBSUB_URL", "")
+    if not url:
+        return None
+    if redis is None:
+        raise RuntimeError("PUBSUB_URL is set but the 'redis' package is not installed")
+    return redis.Redis.from_url(url)
 
+
+def publish_lessons_changed(publisher, user_ids):
+    """One lessons:user message per user, as the API's own scheduler sends them."""
+    if publisher is None or not user_ids:
+        return
+    pipeline = publisher.pipeline(transaction=False)
+    for user_id in user_ids:
+        pipeline.publish(LESSONS_CHANNEL, str(user_id))
+    pipeline.execute()
+
+
+def run_once(chunk_size: int, publisher=None):
+    conn = mysql.connector.connect(**DB_CONFIG)
+    users = set()
+    try:
+        totals = expire_ended_bookings(conn, chunk_size, users)
+        print(
+            f"[{datetime.now()}] Completed {totals['completed']} bookings "
+            f"({totals['recurring']} occurrences generated, {totals['slots_freed']} slots freed) "
+            f"in {totals['chunks']} chunks, {totals['seconds']}s."
+        )
     except mysql.connector.Error as err:
         print(f"Error: {err}")
     finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            conn.close()
+        conn.close()
+    # Also after a failed pass: the chunks committed before it are complete
+    try:
+        publish_lessons_changed(publisher, users)
+    except redis.RedisError as err:
+        print(f"Could not publish lesson changes for {len(users)} users: {err}")
+
 
 def sleep_until_next_half_hour():
     now = datetime.now()
@@ -44,10 +257,24 @@ def sleep_until_next_half_hour():
     print(f"Sleeping for {int(sleep_seconds)} seconds until next check at {next_time.time()}")
     time.sleep(sleep_seconds)
 
+
 def main():
-    #while True:
-        #sleep_until_next_half_hour()
-    update_expired_bookings()
+    parser = argparse.ArgumentParser(description="Complete ended lessons")
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--once", action="store_true", help="run a single pass and exit")
+    mode.add_argument("--daemon", action="store_true", help="run a pass every half hour")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+    load_dotenv()
+    publisher = lessons_publisher()
+
+    if args.once:
+        run_once(args.chunk_size, publisher)
+        return
+    while True:
+        run_once(args.chunk_size, publisher)
+        sleep_until_next_half_hour()
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,211 @@
+"""Weekly tutor availability as 336-bit masks (7 days x 48 half-hour slots).
+
+Each tutor has one row in tutor_week_availability with two BINARY(42)
+columns: `offered` (slots the tutor published) and `booked` (slots taken by
+lessons). Masks travel to MySQL as hex strings wrapped in UNHEX() so the
+bitwise checks and updates happen server-side in a single statement. Every
+write bumps a `version` column, a change counter for readers of the masks.
+
+Transactions that write both tables update the tutor_week_availability row
+before any tutor_availability rows, so they queue on the mask row instead
+of deadlocking each other.
+"""
+
+DAYS = 7
+SLOTS_PER_DAY = 48
+WEEK_SLOTS = DAYS * SLOTS_PER_DAY
+MASK_BYTES = WEEK_SLOTS // 8
+FULL_WEEK = (1 << WEEK_SLOTS) - 1
+
+
+def slot_index(day: int, slot: int) -> int:
+    return day * SLOTS_PER_DAY + slot
+
+
+def valid_range(day: int, start: int, length: int) -> bool:
+    """A booking range must stay within one day."""
+    return 0 <= day < DAYS and 0 <= start and length >= 1 and start + length <= SLOTS_PER_DAY
+
+
+class WeeklyBitmap:
+    __slots__ = ("bits",)
+
+    def __init__(self, bits: int = 0):
+        self.bits = bits & FULL_WEEK
+
+    @classmethod
+    def from_bytes(cls, data) -> "WeeklyBitmap":
+        return cls(int.from_bytes(bytes(data), "big") if data else 0)
+
+    @classmethod
+    def from_slots(cls, slots) -> "WeeklyBitmap":
+        bits = 0
+        for day, slot in slots:
+            bits |= 1 << slot_index(day, slot)
+        return cls(bits)
+
+    @classmethod
+    def from_range(cls, day: int, start: int, length: int) -> "WeeklyBitmap":
+        return cls(((1 << length) - 1) << slot_index(day, start))
+
+    def to_bytes(self) -> bytes:
+        return self.bits.to_bytes(MASK_BYTES, "big")
+
+    def to_hex(self) -> str:
+        return self.to_bytes().hex()
+
+    def is_set(self, day: int, slot: int) -> bool:
+        return bool(self.bits >> slot_index(day, slot) & 1)
+
+    def covers(self, other: "WeeklyBitmap") -> bool:
+        return self.bits & other.bits == other.bits
+
+    def overlaps(self, other: "WeeklyBitmap") -> bool:
+        return bool(self.bits & other.bits)
+
+    def set(self, other: "WeeklyBitmap"):
+        self.bits |= other.bits
+
+    def clear(self, other: "WeeklyBitmap"):
+        self.bits &= ~other.bits
+
+    def __or__(self, other: "WeeklyBitmap") -> "WeeklyBitmap":
+        return WeeklyBitmap(self.bits | other.bits)
+
+    def __and__(self, other: "WeeklyBitmap") -> "WeeklyBitmap":
+        return WeeklyBitmap(self.bits & other.bits)
+
+    def __invert__(self) -> "WeeklyBitmap":
+        return WeeklyBitmap(~self.bits)
+
+    def __bool__(self) -> bool:
+        return bool(self.bits)
+
+    def slots(self) -> list[tuple[int, int]]:
+        """(day, slot) pairs in week order."""
+        result = []
+        bits = self.bits
+        while bits:
+            low = bits & -bits
+            index = low.bit_length() - 1
+            result.append(divmod(index, SLOTS_PER_DAY))
+            bits ^= low
+        return result
+
+
+ZERO_HEX = WeeklyBitmap().to_hex()
+
+# Rows per multi-row statement; a full week (336 slots) fits in one
+WRITE_CHUNK = 500
+
+
+def load_masks(cursor, tutor_id: int) -> tuple[WeeklyBitmap, WeeklyBitmap]:
+    """(offered, booked) for a tutor; empty masks when the tutor has no row yet."""
+    cursor.execute(
+        "SELECT offered, booked FROM tutor_week_availability WHERE tutor_id = %s",
+        (tutor_id,)
+    )
+    row = cursor.fetchone()
+    if not row:
+        return WeeklyBitmap(), WeeklyBitmap()
+    if isinstance(row, dict):
+        row = (row["offered"], row["booked"])
+    return WeeklyBitmap.from_bytes(row[0]), WeeklyBitmap.from_bytes(row[1])
+
+
+def save_offered(cursor, tutor_id: int, offered: WeeklyBitmap):
+    cursor.execute("""
+        INSERT INTO tutor_week_availability (tutor_id, offered, booked)
+        VALUES (%s, UNHEX(%s), UNHEX(%s))
+        ON DUPLICATE KEY UPDATE offered = VALUES(offered), version = version + 1
+    """, (tutor_id, offered.to_hex(), ZERO_HEX))
+
+
+def claim(cursor, tutor_id: int, mask: WeeklyBitmap) -> bool:
+    """Marks every slot in mask as booked iff all are offered and none is booked yet.
+
+    The check and the write are one conditional UPDATE, so concurrent claims
+    for other slots of the same tutor only wait for the row lock; they never
+    fail each other.
+    """
+    mask_hex = mask.to_hex()
+    cursor.execute("""
+        UPDATE tutor_week_availability
+        SET booked = booked | UNHEX(%s), version = version + 1
+        WHERE tutor_id = %s
+          AND (offered & UNHEX(%s)) = UNHEX(%s)
+          AND (booked & UNHEX(%s)) = UNHEX(%s)
+    """, (mask_hex, tutor_id, mask_hex, mask_hex, mask_hex, ZERO_HEX))
+    return cursor.rowcount == 1
+
+
+def release(cursor, tutor_id: int, mask: WeeklyBitmap):
+    cursor.execute("""
+        UPDATE tutor_week_availability
+        SET booked = booked & UNHEX(%s), version = version + 1
+        WHERE tutor_id = %s
+    """, ((~mask).to_hex(), tutor_id))
+
+
+def _chunks(items, size=WRITE_CHUNK):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def insert_slot_rows(cursor, tutor_id: int, slots):
+    """Adds tutor_availability rows for (day, slot) pairs, one statement per chunk."""
+    for chunk in _chunks(sorted(slots)):
+        values = ", ".join(["(%s, %s, %s, TRUE)"] * len(chunk))
+        params = [value for day, slot in chunk for value in (tutor_id, day, slot)]
+        cursor.execute(f"""
+            INSERT INTO tutor_availability (tutor_id, day_of_week, time_slot, is_available)
+            VALUES {values}
+            ON DUPLICATE KEY UPDATE is_available = is_available
+        """, params)
+
+
+def delete_slot_rows(cursor, tutor_id: int, slots):
+    """Removes tutor_availability rows for (day, slot) pairs, one statement per chunk."""
+    for chunk in _chunks(sorted(slots)):
+        pairs = ", ".join(["(%s, %s)"] * len(chunk))
+        params = [tutor_id] + [value for pair in chunk for value in pair]
+        cursor.execute(f"""
+            DELETE FROM tutor_availability
+            WHERE tutor_id = %s AND (day_of_week, time_slot) IN ({pairs})
+        """, params)
+
+
+def mark_slot_rows(cursor, tutor_id: int, day: int, start: int, length: int, is_available: bool):
+    """Flags a contiguous range of tutor_availability rows in a single UPDATE."""
+    cursor.execute("""
+        UPDATE tutor_availability
+        SET is_available = %s
+        WHERE tutor_id = %s AND day_of_week = %s AND time_slot >= %s AND time_slot < %s
+    """, (is_available, tutor_id, day, start, start + length))
+
+
+def release_many(cursor, masks: dict):
+    """Clears booked bits for several tutors ({tutor_id: WeeklyBitmap}) in one UPDATE."""
+    if not masks:
+        return
+    cases = " ".join(["WHEN %s THEN UNHEX(%s)"] * len(masks))
+    params = [value for tutor_id, mask in masks.items() for value in (tutor_id, (~mask).to_hex())]
+    params += list(masks)
+    cursor.execute(f"""
+        UPDATE tutor_week_availability
+        SET booked = booked & CASE tutor_id {cases} END, version = version + 1
+        WHERE tutor_id IN ({", ".join(["%s"] * len(masks))})
+    """, params)
+
+
+def free_slot_rows(cursor, slots):
+    """Marks (tutor_id, day, slot) rows available again, one statement per chunk."""
+    for chunk in _chunks(sorted(slots)):
+        triples = ", ".join(["(%s, %s, %s)"] * len(chunk))
+        params = [value for triple in chunk for value in triple]
+        cursor.execute(f"""
+            UPDATE tutor_availability
+            SET is_available = TRUE
+            WHERE (tutor_id, day_of_week, time_slot) IN ({triples})
+        """, params)
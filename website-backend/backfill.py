@@ -0,0 +1,257 @@
+import argparse
+import glob
+import hashlib
+import multiprocessing
+import os
+import shutil
+import mysql.connector
+from concurrent.futures import ProcessPoolExecutor
+import availability
+import blobstore
+import DB_checker
+import images
+from datetime import datetime
+
+DB_CONFIG = {
+    'host': 'localhost',
+    'database': 'website_db',
+    'user': 'root',
+    'password': 'amsterdam',
+    'use_pure': True
+}
+
+BATCH_SIZE = 1000
+UPLOAD_FOLDER = "uploads"
+UPLOAD_URL_PREFIX = "/uploads/"
+DEFAULT_PICTURE_URL = "/uploads/default_pfp.webp"
+
+
+def id_batches(cursor, table, batch_size):
+    cursor.execute(f"SELECT COALESCE(MIN(id), 0), COALESCE(MAX(id), 0) FROM {table}")
+    low, high = cursor.fetchone()
+    for start in range(low, high + 1, batch_size):
+        yield start, start + batch_size - 1
+
+
+def backfill_conversation_summaries(conn, batch_size):
+    """Rebuilds conversation_summaries from messages, one id range per transaction."""
+    cursor = conn.cursor()
+    total = 0
+    try:
+        for start, end in id_batches(cursor, "conversations", batch_size):
+            cursor.execute("""
+                INSERT INTO conversation_summaries
+                (conversation_id, last_message_id, last_message_content, last_message_time, tutor_unread, student_unread)
+                SELECT
+                    c.id,
+                    m.id,
+                    m.content,
+                    m.sent_at,
+                    (SELECT COUNT(*) FROM messages x
+                     WHERE x.conversation_id = c.id AND x.is_read = FALSE AND x.sender_id = c.student_id),
+                    (SELECT COUNT(*) FROM messages x
+                     WHERE x.conversation_id = c.id AND x.is_read = FALSE AND x.sender_id = c.tutor_id)
+                FROM conversations c
+                LEFT JOIN messages m ON m.id = (
+                    SELECT y.id FROM messages y
+                    WHERE y.conversation_id = c.id
+                    ORDER BY y.sent_at DESC, y.id DESC
+                    LIMIT 1
+                )
+                WHERE c.id BETWEEN %s AND %s
+                ON DUPLICATE KEY UPDATE
+                    last_message_id = VALUES(last_message_id),
+                    last_message_content = VALUES(last_message_content),
+                    last_message_time = VALUES(last_message_time),
+                    tutor_unread = VALUES(tutor_unread),
+                    student_unread = VALUES(student_unread)
+            """, (start, end))
+            conn.commit()
+            total += cursor.rowcount
+    finally:
+        cursor.close()
+    print(f"[{datetime.now()}] conversation-summaries: {total} rows affected.")
+
+
+def backfill_availability_masks(conn, batch_size):
+    """Builds tutor_week_availability masks from tutor_availability rows, batch_size tutors per transaction."""
+    cursor = conn.cursor()
+    total = 0
+    try:
+        cursor.execute("SELECT DISTINCT tutor_id FROM tutor_availability ORDER BY tutor_id")
+        tutor_ids = [row[0] for row in cursor.fetchall()]
+        for i in range(0, len(tutor_ids), batch_size):
+            batch = tutor_ids[i:i + batch_size]
+            placeholders = ", ".join(["%s"] * len(batch))
+            cursor.execute(
+                f"SELECT tutor_id, day_of_week, time_slot, is_available FROM tutor_availability WHERE tutor_id IN ({placeholders})",
+                batch
+            )
+            masks = {tutor_id: (availability.WeeklyBitmap(), availability.WeeklyBitmap()) for tutor_id in batch}
+            for tutor_id, day, slot, is_available in cursor.fetchall():
+                offered, booked = masks[tutor_id]
+                bit = availability.WeeklyBitmap.from_slots([(day, slot)])
+                offered.set(bit)
+                if not is_available:
+                    booked.set(bit)
+            cursor.executemany("""
+                INSERT INTO tutor_week_availability (tutor_id, offered, booked)
+                VALUES (%s, UNHEX(%s), UNHEX(%s))
+                ON DUPLICATE KEY UPDATE offered = VALUES(offered), booked = VALUES(booked), version = version + 1
+            """, [(tutor_id, offered.to_hex(), booked.to_hex()) for tutor_id, (offered, booked) in masks.items()])
+            conn.commit()
+            total += len(batch)
+    finally:
+        cursor.close()
+    print(f"[{datetime.now()}] availability-masks: {total} tutors written.")
+
+
+def backfill_lesson_series(conn, batch_size):
+    """Turns active weekly bookings without a series into lesson_series rows with materialized occurrences."""
+    cursor = conn.cursor(dictionary=True)
+    total = 0
+    try:
+        while True:
+            cursor.execute("""
+                SELECT id, tutor_id, student_id, day_of_week, scheduled_at, duration
+                FROM bookings
+                WHERE active = TRUE AND frequency = 'weekly' AND series_id IS NULL
+                ORDER BY id
+                LIMIT %s
+            """, (batch_size,))
+            bookings = cursor.fetchall()
+            if not bookings:
+                break
+            series_ids = []
+            for booking in bookings:
+                scheduled_at = booking["scheduled_at"]
+                cursor.execute("""
+                    INSERT INTO lesson_series (tutor_id, student_id, day_of_week, time_slot, duration, generated_until)
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                """, (
+                    booking["tutor_id"], booking["student_id"], booking["day_of_week"],
+                    scheduled_at.hour * 2 + scheduled_at.minute // 30, booking["duration"], scheduled_at
+                ))
+                series_ids.append(cursor.lastrowid)
+                cursor.execute("UPDATE bookings SET series_id = %s WHERE id = %s", (series_ids[-1], booking["id"]))
+            DB_checker.extend_series(cursor, series_ids)
+            conn.commit()
+            total += len(bookings)
+    finally:
+        cursor.close()
+    print(f"[{datetime.now()}] lesson-series: {total} weekly bookings converted.")
+
+
+def file_digest(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1 << 20):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def backfill_upload_blobs(conn, batch_size):
+    """Moves profile pictures with legacy names into the content-addressed store, one file per transaction.
+
+    Users sharing identical content end up on one blob. Thumbnails are reset;
+    run the avatars command afterwards.
+    """
+    cursor = conn.cursor()
+    moved = deduplicated = missing = 0
+    try:
+        cursor.execute("""
+            SELECT profile_picture_url, COUNT(*) FROM users
+            WHERE profile_picture_url LIKE '/uploads/%%' AND profile_picture_url <> %s
+            GROUP BY profile_picture_url
+        """, (DEFAULT_PICTURE_URL,))
+        urls = [(url, count) for url, count in cursor.fetchall() if not blobstore.etag_of(url[len(UPLOAD_URL_PREFIX):])]
+        conn.commit()
+        for url, count in urls:
+            path = os.path.join(UPLOAD_FOLDER, url[len(UPLOAD_URL_PREFIX):])
+            if not os.path.isfile(path):
+                missing += 1
+                continue
+            name = blobstore.blob_name(file_digest(path), os.path.splitext(path)[1].lower())
+            tmp_path = os.path.join(UPLOAD_FOLDER, name.replace("/", "_") + ".part")
+            shutil.copyfile(path, tmp_path)
+            if not blobstore.place(UPLOAD_FOLDER, tmp_path, name):
+                deduplicated += 1
+            blobstore.acquire(cursor, name, count)
+            cursor.execute(
+                "UPDATE users SET profile_picture_url = %s, profile_thumbnail_url = NULL WHERE profile_picture_url = %s",
+                (UPLOAD_URL_PREFIX + name, url)
+            )
+            conn.commit()
+            # The legacy file and its derivatives are only removed once nothing points at them
+            for old in [path] + glob.glob(glob.escape(os.path.splitext(path)[0]) + "_*.webp"):
+                os.unlink(old)
+            moved += 1
+    finally:
+        cursor.close()
+    print(f"[{datetime.now()}] upload-blobs: {moved} pictures moved ({deduplicated} duplicates), {missing} missing on disk.")
+
+
+def backfill_avatars(conn, batch_size):
+    """Renders avatar derivatives for uploaded profile pictures that have none, batch_size users per pass."""
+    cursor = conn.cursor()
+    total = missing = 0
+    last_id = 0
+    with ProcessPoolExecutor(mp_context=multiprocessing.get_context("spawn")) as pool:
+        try:
+            while True:
+                cursor.execute("""
+                    SELECT id, profile_picture_url FROM users
+                    WHERE id > %s AND profile_picture_url LIKE '/uploads/%%' AND profile_thumbnail_url IS NULL
+                    ORDER BY id
+                    LIMIT %s
+                """, (last_id, batch_size))
+                rows = cursor.fetchall()
+                conn.commit()
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+                jobs = {}
+                for user_id, url in rows:
+                    filename = url[len("/uploads/"):]
+                    if os.path.isfile(os.path.join(UPLOAD_FOLDER, filename)):
+                        jobs[user_id] = pool.submit(images.make_avatars, UPLOAD_FOLDER, filename)
+                    else:
+                        missing += 1
+                updates = []
+                for user_id, job in jobs.items():
+                    try:
+                        updates.append((f"/uploads/{job.result()[images.THUMBNAIL_SIZE]}", user_id))
+                    except Exception as e:
+                        print(f"user {user_id}: {e}")
+                cursor.executemany("UPDATE users SET profile_thumbnail_url = %s WHERE id = %s", updates)
+                conn.commit()
+                total += len(updates)
+        finally:
+            cursor.close()
+    print(f"[{datetime.now()}] avatars: {total} users updated, {missing} pictures missing on disk.")
+
+
+COMMANDS = {
+    "conversation-summaries": backfill_conversation_summaries,
+    "availability-masks": backfill_availability_masks,
+    "lesson-series": backfill_lesson_series,
+    "upload-blobs": backfill_upload_blobs,
+    "avatars": backfill_avatars,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="One-off data backfills for schema changes in sql.sql")
+    parser.add_argument("command", choices=sorted(COMMANDS))
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    conn = mysql.connector.connect(**DB_CONFIG)
+    try:
+        COMMANDS[args.command](conn, args.batch_size)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
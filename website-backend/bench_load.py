@@ -0,0 +1,111 @@
+"""Throughput of a database-bound endpoint as concurrent clients are added.
+
+Runs a closed loop of --duration seconds at every concurrency level against
+a running backend and prints requests/s and latency per level. With the
+database work on worker threads, throughput should grow with the client
+count until the connection pool (DB_POOL_SIZE) or the database saturates.
+If requests ran on the event loop it would stay flat from one client on.
+A WebSocket for the same account is held open during each level, and its
+ping round trip shows whether the loop stayed responsive.
+
+    python bench_load.py --token <JWT> --user-id 42 --path "/tutors/search?search_term=ma"
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+
+import httpx
+import websockets
+
+DEFAULT_LEVELS = "1,2,4,8,16,32,64"
+PING_INTERVAL = 0.05
+
+
+def percentile(ordered: list[float], fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+async def client_loop(client: httpx.AsyncClient, path: str, deadline: float, latencies: list, errors: list):
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            response = await client.get(path)
+            if response.status_code != 200:
+                errors.append(response.status_code)
+                continue
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+            continue
+        latencies.append(time.perf_counter() - started)
+
+
+async def ping_loop(url: str, deadline: float, latencies: list):
+    """WebSocket ping round trips; the server answers them on its event loop."""
+    async with websockets.connect(url) as ws:
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            pong = await ws.ping()
+            await pong
+            latencies.append(time.perf_counter() - started)
+            await asyncio.sleep(PING_INTERVAL)
+
+
+async def run_level(args, concurrency: int) -> dict:
+    headers = {"Authorization": f"Bearer {args.token}"}
+    limits = httpx.Limits(max_connections=concurrency)
+    latencies, errors, pings = [], [], []
+    ws_url = args.url.replace("http", "ws", 1) + f"/ws/{args.user_id}?token={args.token}"
+    async with httpx.AsyncClient(base_url=args.url, headers=headers, limits=limits, timeout=30) as client:
+        deadline = time.perf_counter() + args.duration
+        started = time.perf_counter()
+        await asyncio.gather(
+            ping_loop(ws_url, deadline, pings),
+            *(client_loop(client, args.path, deadline, latencies, errors) for _ in range(concurrency)),
+        )
+        elapsed = time.perf_counter() - started
+    latencies.sort()
+    pings.sort()
+    return {
+        "concurrency": concurrency,
+        "requests_per_s": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1) if latencies else None,
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+        "errors": len(errors),
+        "ws_ping_p99_ms": round(percentile(pings, 0.99) * 1000, 1),
+    }
+
+
+async def run(args) -> list[dict]:
+    results = []
+    for concurrency in (int(level) for level in args.levels.split(",")):
+        result = await run_level(args, concurrency)
+        print(
+            f"{result['concurrency']:>4} clients: {result['requests_per_s']:>8.1f} req/s, "
+            f"p50 {result['p50_ms']}ms, p99 {result['p99_ms']}ms, {result['errors']} errors, "
+            f"ws ping p99 {result['ws_ping_p99_ms']}ms"
+        )
+        results.append(result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Closed-loop load benchmark for one endpoint")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--token", required=True, help="access token of a test account")
+    parser.add_argument("--user-id", type=int, required=True, help="id of that account, for the WebSocket")
+    parser.add_argument("--path", default="/lessons", help="endpoint to load, with its query string")
+    parser.add_argument("--levels", default=DEFAULT_LEVELS, help="comma-separated client counts")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per level")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON as well")
+    args = parser.parse_args()
+    results = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(results, indent=2))
+    sys.exit(0 if all(result["errors"] == 0 for result in results) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Microbenchmark of tutor search: TutorSearchIndex vs LIKE '%term%' scans.
+
+Builds synthetic sets of verified tutors (10k and 100k by default), then
+for each set loads them into TutorSearchIndex and into an in-memory SQLite
+table. For every query term it times three things:
+- index.search(), as /tutors/search runs it
+- the fallback /tutors/search uses while the index is not ready: a
+  substring LIKE on name and subject
+- the LIKE query that answers what the index answers: every query word as a
+  word prefix anywhere in name, subject, title or bio
+
+The index and that last query must return the same tutors. SQLite stands in
+for MySQL here: both answer a leading-wildcard LIKE with a full scan, so the
+scaling matches even though the absolute times do not. No database is needed.
+
+    python bench_search.py --tutors 10000,100000
+"""
+import argparse
+import random
+import sqlite3
+import sys
+import time
+import timeit
+
+import main
+
+FIRST_NAMES = ["Иван", "Мария", "Георги", "Елена", "Петър", "Николай", "Десислава", "Ивана", "Anna", "Martin"]
+LAST_NAMES = ["Петров", "Иванова", "Георгиев", "Димитрова", "Николов", "Стоянова", "Петкова", "Smith", "Müller"]
+SUBJECTS = ["Математика", "Физика", "Химия", "Биология", "Английски", "Информатика", "История", "Икономика"]
+TITLE_WORDS = ["подготовка", "матури", "олимпиади", "кандидатстване", "english", "conversation", "програмиране"]
+BIO_WORDS = [
+    "преподавам", "от", "години", "ученици", "студенти", "онлайн", "уроци", "индивидуален", "подход",
+    "математическа", "физическа", "grammar", "exam", "python", "алгебра", "геометрия", "задачи",
+]
+
+# Prefixes and multi-word queries; each must match at least one tutor
+TERMS = ["мат", "математика", "иван", "ив пет", "физ олимп", "english", "подгот мат", "алгеб геом"]
+
+# The /tutors/search fallback while the index is loading
+FALLBACK_QUERY = """
+    SELECT id FROM users
+    WHERE (first_name || ' ' || last_name LIKE ? OR subject LIKE ?)
+"""
+
+
+def tutor_rows(count: int, seed: int) -> list[dict]:
+    rng = random.Random(seed)
+    return [
+        {
+            "id": i,
+            "first_name": rng.choice(FIRST_NAMES),
+            "last_name": rng.choice(LAST_NAMES),
+            "subject": rng.choice(SUBJECTS),
+            "profile_title": " ".join(rng.sample(TITLE_WORDS, 2)).capitalize(),
+            "bio": " ".join(rng.choices(BIO_WORDS, k=rng.randint(8, 30))).capitalize() + ".",
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+def search_text(row: dict) -> str:
+    """Every indexed field, normalized the way the index tokenizes it, one space between words."""
+    fields = (row["first_name"], row["last_name"], row["subject"], row["profile_title"], row["bio"])
+    return " ".join(main.normalize_search_text(" ".join(field or "" for field in fields)))
+
+
+def load_sqlite(rows: list[dict]) -> sqlite3.Connection:
+    db = sqlite3.connect(":memory:")
+    db.execute("""
+        CREATE TABLE users (
+            id INTEGER PRIMARY KEY, first_name TEXT, last_name TEXT, subject TEXT,
+            profile_title TEXT, bio TEXT, search_text TEXT
+        )
+    """)
+    db.executemany(
+        "INSERT INTO users VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [
+            (row["id"], row["first_name"], row["last_name"], row["subject"], row["profile_title"], row["bio"],
+             search_text(row))
+            for row in rows
+        ],
+    )
+    db.commit()
+    return db
+
+
+def like_fallback(db: sqlite3.Connection, term: str) -> set[int]:
+    return {row[0] for row in db.execute(FALLBACK_QUERY, (f"%{term}%", f"%{term}%"))}
+
+
+def like_word_prefix(db: sqlite3.Connection, term: str) -> set[int]:
+    """Tutors with every query word as a word prefix: the index's matching rule as a LIKE scan."""
+    tokens = main.normalize_search_text(term)
+    conditions = " AND ".join(["' ' || search_text LIKE ?"] * len(tokens))
+    return {row[0] for row in db.execute(f"SELECT id FROM users WHERE {conditions}", [f"% {t}%" for t in tokens])}
+
+
+def best_ms(fn, number: int) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=3)) / number * 1000
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Search index vs LIKE microbenchmark")
+    parser.add_argument("--tutors", default="10000,100000", help="comma-separated tutor counts")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    ok = True
+    for count in (int(value) for value in args.tutors.split(",")):
+        rows = tutor_rows(count, args.seed)
+        index = main.TutorSearchIndex()
+        started = time.perf_counter()
+        index.rebuild(rows)
+        build_ms = (time.perf_counter() - started) * 1000
+        db = load_sqlite(rows)
+        print(f"\n{count} tutors, index built in {build_ms:.0f}ms ({index.stats()['terms']} terms)")
+        print(f"{'term':<14} {'matches':>8} {'index':>10} {'LIKE fallback':>14} {'LIKE prefix':>12}")
+        for term in TERMS:
+            matches = set(index.search(term))
+            expected = like_word_prefix(db, term)
+            if matches != expected or not matches:
+                print(f"{term:<14} index returned {len(matches)} tutors, LIKE {len(expected)}")
+                ok = False
+                continue
+            number = max(1, 200000 // count)
+            index_ms = best_ms(lambda: index.search(term, main.SEARCH_MAX_RESULTS), number)
+            fallback_ms = best_ms(lambda: like_fallback(db, term), 1)
+            prefix_ms = best_ms(lambda: like_word_prefix(db, term), 1)
+            print(
+                f"{term:<14} {len(matches):>8} {index_ms:>8.2f}ms {fallback_ms:>12.2f}ms {prefix_ms:>10.2f}ms"
+            )
+        db.close()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main_cli()
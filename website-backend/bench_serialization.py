@@ -0,0 +1,87 @@
+"""Microbenchmark of the list endpoints' serialization: response_model path vs FastJSONResponse.
+
+For synthetic /tutors/search and message history pages it times what a
+plain return costs: dict rows validated against the response_model, dumped
+to JSON-compatible data and encoded like Starlette's JSONResponse. It also
+times the fast path: tuple rows into the __slots__ row classes, encoded by
+fastjson.dumps. Both must produce the same JSON. No database is needed.
+
+    python bench_serialization.py --rows 20,100,1000
+"""
+import argparse
+import json
+import sys
+import timeit
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from pydantic import TypeAdapter
+
+import main
+import fastjson
+
+TUTOR_COLUMNS = ("public_id", "name", "subject", "rating", "price", "image", "description")
+MESSAGE_COLUMNS = ("id", "conversation_id", "sender_id", "content", "sent_at", "is_read")
+
+
+def tutor_rows(count: int) -> list[tuple]:
+    return [
+        (
+            f"tutor-{i:06d}", f"Име Фамилия {i}", "Математика", Decimal("4.75"), Decimal("35.00"),
+            f"/uploads/ab/cd/{i:064x}_128.webp", "Подготовка за матури и олимпиади",
+        )
+        for i in range(count)
+    ]
+
+
+def message_rows(count: int) -> list[tuple]:
+    sent = datetime(2026, 1, 1, 12, 0, 0)
+    return [
+        (i, 7, 1 + i % 2, f"Здравей, урокът в четвъртък остава ли в {i % 24}:00?", sent + timedelta(minutes=i), i % 3 == 0)
+        for i in range(count)
+    ]
+
+
+def response_model_path(adapter: TypeAdapter, columns: tuple, rows: list[tuple]) -> bytes:
+    dicts = [dict(zip(columns, row)) for row in rows]  # what a dictionary cursor returns
+    content = adapter.dump_python(adapter.validate_python(dicts), mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+
+def fast_path(row_class, rows: list[tuple]) -> bytes:
+    return fastjson.dumps([row_class(*row) for row in rows])
+
+
+CASES = {
+    "tutors/search": (tutor_rows, TypeAdapter(list[main.Tutor]), TUTOR_COLUMNS, main.TutorCard),
+    "messages": (message_rows, TypeAdapter(list[main.Message]), MESSAGE_COLUMNS, main.MessageRow),
+}
+
+
+def best_ms(fn, number: int) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1000
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Serialization microbenchmark for the list endpoints")
+    parser.add_argument("--rows", default="20,100,1000", help="comma-separated page sizes")
+    args = parser.parse_args()
+    print(f"encoder: {'orjson' if fastjson.orjson is not None else 'stdlib json'}")
+    print(f"{'endpoint':<14} {'rows':>6} {'response_model':>16} {'fast path':>12} {'speedup':>8}")
+    ok = True
+    for name, (make_rows, adapter, columns, row_class) in CASES.items():
+        for count in (int(value) for value in args.rows.split(",")):
+            rows = make_rows(count)
+            if json.loads(response_model_path(adapter, columns, rows)) != json.loads(fast_path(row_class, rows)):
+                print(f"{name}: the two paths produce different JSON")
+                ok = False
+                continue
+            number = max(1, 20000 // count)
+            slow = best_ms(lambda: response_model_path(adapter, columns, rows), number)
+            fast = best_ms(lambda: fast_path(row_class, rows), number)
+            print(f"{name:<14} {count:>6} {slow:>14.3f}ms {fast:>10.3f}ms {slow / fast:>7.1f}x")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main_cli()
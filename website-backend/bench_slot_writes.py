@@ -0,0 +1,120 @@
+"""Statements and time for tutor_availability writes: one row per statement vs the bulk helpers.
+
+Replays what save_availability and delete_lesson write for one tutor,
+once the way they used to (one INSERT, DELETE or UPDATE per slot) and once
+through availability.insert_slot_rows / delete_slot_rows / mark_slot_rows,
+and prints statements (round trips) and milliseconds per operation. Every
+repetition runs in a transaction that is rolled back, so the tutor's rows
+are left as they were.
+
+    python bench_slot_writes.py --tutor-id 42 --repeat 20
+"""
+import argparse
+import statistics
+import time
+import mysql.connector
+
+import availability
+from DB_checker import DB_CONFIG
+
+FULL_WEEK = [(day, slot) for day in range(availability.DAYS) for slot in range(availability.SLOTS_PER_DAY)]
+LESSON = (2, 20, 4)  # day, start slot, length: a two-hour lesson
+
+
+class CountingCursor:
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.statements = 0
+
+    def execute(self, *args, **kwargs):
+        self.statements += 1
+        return self._cursor.execute(*args, **kwargs)
+
+
+def per_row_insert(cursor, tutor_id: int, slots):
+    for day, slot in slots:
+        cursor.execute(
+            "INSERT INTO tutor_availability (tutor_id, day_of_week, time_slot, is_available) VALUES (%s, %s, %s, TRUE)",
+            (tutor_id, day, slot)
+        )
+
+
+def per_row_delete(cursor, tutor_id: int, slots):
+    for day, slot in slots:
+        cursor.execute(
+            "DELETE FROM tutor_availability WHERE tutor_id = %s AND day_of_week = %s AND time_slot = %s",
+            (tutor_id, day, slot)
+        )
+
+
+def per_row_mark(cursor, tutor_id: int, day: int, start: int, length: int, is_available: bool):
+    for slot in range(start, start + length):
+        cursor.execute(
+            "UPDATE tutor_availability SET is_available = %s WHERE tutor_id = %s AND day_of_week = %s AND time_slot = %s",
+            (is_available, tutor_id, day, slot)
+        )
+
+
+# operation -> (starts from a full week of rows, per-row version, bulk version)
+OPERATIONS = {
+    "publish full week": (
+        False,
+        lambda cursor, tutor_id: per_row_insert(cursor, tutor_id, FULL_WEEK),
+        lambda cursor, tutor_id: availability.insert_slot_rows(cursor, tutor_id, FULL_WEEK),
+    ),
+    "clear full week": (
+        True,
+        lambda cursor, tutor_id: per_row_delete(cursor, tutor_id, FULL_WEEK),
+        lambda cursor, tutor_id: availability.delete_slot_rows(cursor, tutor_id, FULL_WEEK),
+    ),
+    "free a 2h lesson": (
+        True,
+        lambda cursor, tutor_id: per_row_mark(cursor, tutor_id, *LESSON, True),
+        lambda cursor, tutor_id: availability.mark_slot_rows(cursor, tutor_id, *LESSON, True),
+    ),
+}
+
+
+def measure(conn, tutor_id: int, operation, starts_full: bool, repeat: int) -> tuple[int, float]:
+    """(statements, median milliseconds) of one operation."""
+    cursor = conn.cursor()
+    timings = []
+    statements = 0
+    try:
+        for _ in range(repeat):
+            cursor.execute("DELETE FROM tutor_availability WHERE tutor_id = %s", (tutor_id,))
+            if starts_full:
+                availability.insert_slot_rows(cursor, tutor_id, FULL_WEEK)
+            counting = CountingCursor(cursor)
+            started = time.perf_counter()
+            operation(counting, tutor_id)
+            timings.append((time.perf_counter() - started) * 1000)
+            statements = counting.statements
+            conn.rollback()
+    finally:
+        conn.rollback()
+        cursor.close()
+    return statements, statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-row vs bulk tutor_availability writes")
+    parser.add_argument("--tutor-id", type=int, required=True, help="a tutor; every change is rolled back")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    conn = mysql.connector.connect(**DB_CONFIG)
+    try:
+        print(f"{'operation':<20} {'per-row':>22} {'bulk':>22}")
+        for name, (starts_full, per_row, bulk) in OPERATIONS.items():
+            row_statements, row_ms = measure(conn, args.tutor_id, per_row, starts_full, args.repeat)
+            bulk_statements, bulk_ms = measure(conn, args.tutor_id, bulk, starts_full, args.repeat)
+            print(
+                f"{name:<20} {row_statements:>5} stmts {row_ms:>8.2f}ms "
+                f"{bulk_statements:>5} stmts {bulk_ms:>8.2f}ms"
+            )
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
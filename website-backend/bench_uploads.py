@@ -0,0 +1,136 @@
+"""Concurrent profile picture uploads against a running backend.
+
+Sends --uploads distinct JPEGs from --concurrency clients to
+/upload-profile-picture/ while a probe requests /balance every few
+milliseconds, and prints upload throughput, upload latency and the probe's
+latency: if uploads blocked the event loop, the probe would stall with them.
+Then streams one chunked body twice the size cap without Content-Length
+and reports how quickly it was refused.
+
+The account's profile picture is replaced by every upload.
+
+    python bench_uploads.py --url http://localhost:8000 --token <JWT> --concurrency 16 --uploads 200
+"""
+import argparse
+import asyncio
+import io
+import os
+import statistics
+import sys
+import time
+
+import httpx
+from PIL import Image
+
+UPLOAD_PATH = "/upload-profile-picture/"
+PROBE_PATH = "/balance"
+PROBE_INTERVAL = 0.01
+OVERSIZE_CHUNK = 64 * 1024
+
+
+def make_jpeg(size: int) -> bytes:
+    buffer = io.BytesIO()
+    Image.effect_noise((size, size), 64).convert("RGB").save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def percentiles(samples: list[float]) -> str:
+    if not samples:
+        return "no samples"
+    ordered = sorted(samples)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    return f"p50 {statistics.median(ordered) * 1000:.1f}ms, p99 {p99 * 1000:.1f}ms, max {ordered[-1] * 1000:.1f}ms"
+
+
+async def upload_worker(client: httpx.AsyncClient, image: bytes, queue: asyncio.Queue, latencies: list, statuses: dict):
+    while True:
+        try:
+            queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return
+        # Bytes after the JPEG end marker are ignored by decoders but make every upload a new blob
+        body = image + os.urandom(16)
+        started = time.perf_counter()
+        response = await client.post(UPLOAD_PATH, files={"file": ("bench.jpg", body, "image/jpeg")})
+        latencies.append(time.perf_counter() - started)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+
+async def probe(client: httpx.AsyncClient, latencies: list, done: asyncio.Event):
+    while not done.is_set():
+        started = time.perf_counter()
+        await client.get(PROBE_PATH)
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(PROBE_INTERVAL)
+
+
+async def oversize(client: httpx.AsyncClient, max_bytes: int) -> tuple[int, int, float]:
+    sent = 0
+
+    async def body():
+        nonlocal sent
+        boundary = b"--bench\r\nContent-Disposition: form-data; name=\"file\"; filename=\"big.jpg\"\r\n\r\n"
+        yield boundary
+        chunk = b"\xff" * OVERSIZE_CHUNK
+        while sent < max_bytes * 2:
+            sent += len(chunk)
+            yield chunk
+
+    started = time.perf_counter()
+    try:
+        response = await client.post(
+            UPLOAD_PATH, content=body(), headers={"Content-Type": "multipart/form-data; boundary=bench"}
+        )
+        code = response.status_code
+    except httpx.HTTPError:
+        code = 0  # the server closed the connection mid-body
+    return code, sent, time.perf_counter() - started
+
+
+async def run(args) -> bool:
+    headers = {"Authorization": f"Bearer {args.token}"}
+    limits = httpx.Limits(max_connections=args.concurrency + 2)
+    image = make_jpeg(args.image_size)
+    async with httpx.AsyncClient(base_url=args.url, headers=headers, limits=limits, timeout=60) as client:
+        queue: asyncio.Queue = asyncio.Queue()
+        for i in range(args.uploads):
+            queue.put_nowait(i)
+        upload_latencies, probe_latencies, statuses = [], [], {}
+        done = asyncio.Event()
+        probe_task = asyncio.create_task(probe(client, probe_latencies, done))
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            upload_worker(client, image, queue, upload_latencies, statuses) for _ in range(args.concurrency)
+        ))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await probe_task
+
+        print(
+            f"{args.uploads} uploads of {len(image) // 1024} KiB in {elapsed:.2f}s "
+            f"({args.uploads / elapsed:.1f}/s) over {args.concurrency} clients, statuses {statuses}"
+        )
+        print(f"upload latency: {percentiles(upload_latencies)}")
+        print(f"{PROBE_PATH} during uploads: {percentiles(probe_latencies)}")
+
+        code, sent, seconds = await oversize(client, args.max_bytes)
+        print(f"chunked {args.max_bytes * 2 // 1024} KiB body: status {code or 'connection closed'} "
+              f"after {seconds * 1000:.0f}ms, {sent // 1024} KiB sent")
+    return set(statuses) == {200} and code in (0, 413)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent upload benchmark for /upload-profile-picture/")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--token", required=True, help="access token of a test account")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--uploads", type=int, default=200)
+    parser.add_argument("--image-size", type=int, default=1024, help="edge of the uploaded JPEG in pixels")
+    parser.add_argument("--max-bytes", type=int, default=5 * 1024 * 1024, help="the server's UPLOAD_MAX_BYTES")
+    args = parser.parse_args()
+    ok = asyncio.run(run(args))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
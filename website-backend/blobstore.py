@@ -0,0 +1,104 @@
+"""Content-addressed storage for uploaded files.
+
+Files are named by the SHA-256 of their content and sharded two levels deep
+(uploads/ab/cd/abcd...ef.jpg), so identical uploads share one file and a
+name never changes content, which lets clients cache it forever.
+Derivatives sit next to their source as <digest>_<size>.webp.
+
+upload_blobs counts the users referencing each file. Blobs whose count
+dropped to zero are deleted by collect_garbage, derivatives included, once
+they have been unreferenced for a grace period.
+"""
+import glob
+import os
+import re
+from typing import Optional
+
+BLOB_NAME = re.compile(r"^[0-9a-f]{2}/[0-9a-f]{2}/([0-9a-f]{64}(?:_\d+)?)\.[a-z0-9]+$")
+
+# Blobs examined per collect_garbage statement
+GC_CHUNK = 500
+
+
+def blob_name(digest: str, extension: str) -> str:
+    return f"{digest[:2]}/{digest[2:4]}/{digest}{extension}"
+
+
+def etag_of(name: str) -> Optional[str]:
+    """Strong validator for a content-addressed name (blob or derivative); None for anything else."""
+    match = BLOB_NAME.match(name)
+    return match.group(1) if match else None
+
+
+def place(folder: str, tmp_path: str, name: str) -> bool:
+    """Moves tmp_path to folder/name unless that content is already stored; True when the file is new."""
+    path = os.path.join(folder, name)
+    if os.path.exists(path):
+        os.unlink(tmp_path)
+        return False
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    os.replace(tmp_path, path)
+    return True
+
+
+def track(cursor, name: str):
+    """Registers a stored blob without referencing it, so collect_garbage removes it unless acquired."""
+    cursor.execute(
+        "INSERT IGNORE INTO upload_blobs (name, refs, released_at) VALUES (%s, 0, NOW())",
+        (name,)
+    )
+
+
+def acquire(cursor, name: str, count: int = 1):
+    """Adds references; also locks the row, which collect_garbage skips."""
+    cursor.execute("""
+        INSERT INTO upload_blobs (name, refs) VALUES (%s, %s)
+        ON DUPLICATE KEY UPDATE refs = refs + VALUES(refs), released_at = NULL
+    """, (name, count))
+
+
+def release(cursor, name: str):
+    # Assignments apply left to right, so released_at sees the decremented count
+    cursor.execute("""
+        UPDATE upload_blobs
+        SET refs = refs - 1, released_at = IF(refs = 0, NOW(), NULL)
+        WHERE name = %s AND refs > 0
+    """, (name,))
+
+
+def collect_garbage(conn, folder: str, grace_seconds: int) -> int:
+    """Deletes blobs unreferenced for longer than grace_seconds; returns how many were removed."""
+    cursor = conn.cursor()
+    removed = 0
+    try:
+        while True:
+            cursor.execute("""
+                SELECT name FROM upload_blobs
+                WHERE released_at < NOW() - INTERVAL %s SECOND AND refs = 0
+                ORDER BY released_at
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            """, (grace_seconds, GC_CHUNK))
+            names = [row[0] for row in cursor.fetchall()]
+            if not names:
+                conn.commit()
+                return removed
+            for name in names:
+                path = os.path.join(folder, name)
+                for derivative in glob.glob(glob.escape(os.path.splitext(path)[0]) + "_*.webp"):
+                    os.unlink(derivative)
+                if os.path.exists(path):
+                    os.unlink(path)
+            cursor.execute(
+                f"DELETE FROM upload_blobs WHERE name IN ({', '.join(['%s'] * len(names))})",
+                names
+            )
+            conn.commit()
+            removed += len(names)
+            if len(names) < GC_CHUNK:
+                return removed
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
@@ -1,12 +1,12 @@
 $PI_USER = "pi"
 $PI_HOST = "192.168.100.100"  # or your Pi's IP
 $PI_PASSWORD = "amsterdam"   # Consider using SSH keys instead!
-$SOURCE_FILE = "./main.py"
+$SOURCE_FILES = "./*.py"
 $DEST_DIR = "~/website-backend"
 
 # Transfer the file
-Write-Host "Uploading main.py to Pi..."
-scp "$SOURCE_FILE" "${PI_USER}@${PI_HOST}:${DEST_DIR}/main.py"
+Write-Host "Uploading backend modules to Pi..."
+scp $SOURCE_FILES "${PI_USER}@${PI_HOST}:${DEST_DIR}/"
 if ($LASTEXITCODE -ne 0) {
     Write-Host "File transfer failed!" -ForegroundColor Red
     exit 1
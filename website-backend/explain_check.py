@@ -0,0 +1,67 @@
+"""Fails when a lesson time-window query falls back to a full scan of bookings.
+
+Runs EXPLAIN on the queries behind the lesson snapshot (/lessons,
+/students/next-lesson, /total-lessons), /get-lesson-link, Jitsi room
+provisioning and lesson expiry. Point it at a database with representative
+data: on near-empty tables MySQL may legitimately prefer a scan.
+
+    python explain_check.py --user-id 42
+"""
+import argparse
+import sys
+import mysql.connector
+from datetime import datetime
+
+import main
+import DB_checker
+
+BOOKINGS_ALIASES = {"bookings", "b", "p"}
+
+
+def checked_queries(user_id: int) -> dict:
+    return {
+        "lesson-link (tutor)": (main.LESSON_LINK_QUERY.format(filter_key="tutor_id"), (user_id,)),
+        "lesson-link (student)": (main.LESSON_LINK_QUERY.format(filter_key="student_id"), (user_id,)),
+        "lessons (tutor)": (main.LESSONS_QUERY["tutor"], (user_id,)),
+        "lessons (student)": (main.LESSONS_QUERY["student"], (user_id,)),
+        "total-lessons (tutor)": (main.TOTAL_LESSONS_QUERY["tutor"], (user_id,)),
+        "total-lessons (student)": (main.TOTAL_LESSONS_QUERY["student"], (user_id,)),
+        "jitsi provisioning": (
+            main.UNPROVISIONED_LESSONS_QUERY,
+            (main.JITSI_PROVISION_AHEAD_MINUTES, main.JITSI_PROVISION_AHEAD_MINUTES),
+        ),
+        "expiry horizon": (main.UPCOMING_EXPIRIES_QUERY, (datetime.now(),)),
+        "expiry runner": (DB_checker.EXPIRED_BOOKINGS_QUERY, (DB_checker.CHUNK_SIZE,)),
+    }
+
+
+def full_scans(cursor, sql: str, params) -> list[str]:
+    cursor.execute("EXPLAIN " + sql, params)
+    return [
+        f"{row['table']}: type={row['type']} key={row['key']}"
+        for row in cursor.fetchall()
+        if row["table"] in BOOKINGS_ALIASES and (row["type"] == "ALL" or row["key"] is None)
+    ]
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="EXPLAIN regression check for lesson queries")
+    parser.add_argument("--user-id", type=int, default=1, help="user id bound to the per-user queries")
+    args = parser.parse_args()
+
+    conn = mysql.connector.connect(**main.DB_CONFIG)
+    cursor = conn.cursor(dictionary=True)
+    failed = False
+    try:
+        for name, (sql, params) in checked_queries(args.user_id).items():
+            problems = full_scans(cursor, sql, params)
+            failed = failed or bool(problems)
+            print(f"{'FAIL' if problems else 'ok  '} {name}" + "".join(f"\n     {p}" for p in problems))
+    finally:
+        cursor.close()
+        conn.close()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,46 @@
+"""Fast JSON responses for the list endpoints.
+
+Handlers read rows with tuple cursors into __slots__ dataclasses whose
+fields follow their SELECT list, and return a FastJSONResponse, which
+encodes them straight to bytes. That skips the per-row dict, the
+response_model re-validation and jsonable_encoder a plain return goes
+through, so the row classes are the response schema for those endpoints.
+
+orjson is used when installed (pip install orjson), the stdlib encoder
+otherwise; both produce the same output.
+"""
+import dataclasses
+import json
+from datetime import date
+from decimal import Decimal
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if orjson is None:
+        if isinstance(value, date):
+            return value.isoformat()
+        if dataclasses.is_dataclass(value):
+            return {field.name: getattr(value, field.name) for field in dataclasses.fields(value)}
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(value) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value, default=_default)
+    return json.dumps(value, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
@@ -0,0 +1,37 @@
+"""Avatar derivatives rendered by workers of the image process pool (procpool.py)."""
+import os
+from PIL import Image, ImageOps
+
+AVATAR_SIZES = (64, 128, 256)
+THUMBNAIL_SIZE = 128  # what search cards and conversation lists link to (2x their CSS size)
+WEBP_QUALITY = 80
+
+# Decompression bomb guard; profile pictures never need more than this
+Image.MAX_IMAGE_PIXELS = 40_000_000
+
+
+def avatar_name(filename: str, size: int) -> str:
+    return f"{os.path.splitext(filename)[0]}_{size}.webp"
+
+
+def make_avatars(folder: str, filename: str) -> dict:
+    """Writes square WebP crops of folder/filename for every AVATAR_SIZES entry.
+
+    Returns {size: derivative filename}. Raises on anything Pillow cannot
+    decode, so the caller can reject the upload.
+    """
+    with Image.open(os.path.join(folder, filename)) as source:
+        source.draft("RGB", (max(AVATAR_SIZES), max(AVATAR_SIZES)))  # JPEG: decode at reduced scale
+        image = ImageOps.exif_transpose(source)
+        image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+
+    names = {}
+    for size in sorted(AVATAR_SIZES, reverse=True):
+        image = ImageOps.fit(image, (size, size), Image.LANCZOS)
+        name = avatar_name(filename, size)
+        tmp_path = os.path.join(folder, name + ".part")
+        image.save(tmp_path, "WEBP", quality=WEBP_QUALITY, method=4)
+        os.replace(tmp_path, os.path.join(folder, name))
+        names[size] = name
+    return names
+
@@ -0,0 +1,63 @@
+"""Outbound email templates and transport.
+
+Templates are parsed once at import and only substituted per message.
+Sending goes through the Resend SDK, which reads RESEND_API_URL, so a
+local stub HTTP server can stand in for the real API.
+"""
+import os
+from string import Template
+
+import resend
+
+resend.api_key = os.getenv("RESEND_API_KEY")
+EMAIL_FROM = os.getenv("EMAIL_FROM", "Infizity <info@infizity.com>")
+
+# template name -> (subject, body)
+TEMPLATES = {
+    "verification": (
+        "Потвърдете вашия имейл",  # "Verify your email" in Bulgarian
+        Template("""
+                <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
+                    <h2 style="color: #2563eb;">Потвърждение на имейл адрес</h2>
+                    <p>Моля, кликнете на линка по-долу, за да потвърдите вашия имейл адрес:</p>
+                    <a
+                        href="$link"
+                        style="
+                            display: inline-block;
+                            margin: 16px 0;
+                            padding: 12px 24px;
+                            background-color: #2563eb;
+                            color: white;
+                            text-decoration: none;
+                            border-radius: 4px;
+                            font-weight: bold;
+                        "
+                    >
+                        Потвърди имейл
+                    </a>
+                    <p>Ако не сте поискали това потвърждение, моля игнорирайте този имейл.</p>
+                    <p style="margin-top: 24px; color: #6b7280; font-size: 14px;">
+                        С уважение,<br>
+                        Екипът на Infizity
+                    </p>
+                </div>
+                """),
+    ),
+}
+
+
+def check_configured():
+    """Raises unless an API key is set; called when the email workers start."""
+    if not resend.api_key:
+        raise RuntimeError("RESEND_API_KEY is not set")
+
+
+def render(template: str, params: dict) -> tuple[str, str]:
+    subject, body = TEMPLATES[template]
+    return subject, body.substitute(params)
+
+
+def send(recipient: str, template: str, params: dict):
+    """Blocking; raises on any transport or API error."""
+    subject, html = render(template, params)
+    resend.Emails.send({"from": EMAIL_FROM, "to": [recipient], "subject": subject, "html": html})
@@ -1,55 +1,296 @@
 from fastapi import FastAPI, APIRouter, HTTPException, Depends, Header, status, UploadFile, File, Body
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse
+from starlette.staticfiles import NotModifiedResponse
+from starlette.datastructures import Headers
+from fastapi.responses import JSONResponse, Response, FileResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, constr, EmailStr
 from typing import Optional
 from typing import List
 import mysql.connector
-from mysql.connector import Error
-from passlib.context import CryptContext
+from mysql.connector import Error, errorcode
 import jwt
 from jwt import PyJWTError
 import os
-import shutil
+import tempfile
 import logging
+import threading
+import time
+import base64
+import hashlib
+import re
+import bisect
+import heapq
+import unicodedata
+import asyncio
+from collections import deque, OrderedDict
 from datetime import datetime, timedelta
+from decimal import Decimal
+from dataclasses import dataclass
 import secrets
 import json
 from fastapi import WebSocket, WebSocketDisconnect
 from fastapi import Query
 import uuid
 import secrets
-import resend
+import anyio
 from dotenv import load_dotenv
-import os
 
-load_dotenv()
+load_dotenv()  # before the app modules below, which read their settings at import
+import passwords
+import images
+import procpool
+import blobstore
+from fastjson import FastJSONResponse
+import metrics
+import mailer
+import availability
+import DB_checker
+import os
 router = APIRouter()
 
 
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: dict[int, WebSocket] = {}
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # only needed when PUBSUB_URL points at a Redis broker
+    aioredis = None
 
-    async def connect(self, websocket: WebSocket, user_id: int):
-        await websocket.accept()
-        self.active_connections[user_id] = websocket
+# Real-time delivery backend: empty = in-process (single worker), redis://... = shared broker
+PUBSUB_URL = os.getenv("PUBSUB_URL", "")
+BROADCAST_CHANNEL = "ws:broadcast"
+
+
+def user_channel(user_id: int) -> str:
+    return f"ws:user:{user_id}"
+
+
+class InMemoryPubSub:
+    """Delivers published messages straight back to this process."""
+
+    async def start(self, handler):
+        self._handler = handler
+
+    async def stop(self):
+        pass
+
+    async def subscribe(self, channel: str):
+        pass
+
+    async def unsubscribe(self, channel: str):
+        pass
+
+    async def publish(self, channel: str, message: str):
+        await self._handler(channel, message)
+
+
+class RedisPubSub:
+    """Redis pub/sub, so a message published by any worker reaches sockets on every worker/host."""
 
-    def disconnect(self, user_id: int):
-        if user_id in self.active_connections:
-            del self.active_connections[user_id]
+    def __init__(self, url: str):
+        if aioredis is None:
+            raise RuntimeError("PUBSUB_URL is set but the 'redis' package is not installed")
+        self.url = url
+        self._channels = {BROADCAST_CHANNEL}
+
+    async def start(self, handler):
+        self._handler = handler
+        self._redis = aioredis.from_url(self.url, decode_responses=True)
+        self._pubsub = self._redis.pubsub()
+        await self._pubsub.subscribe(*self._channels)
+        self._reader = asyncio.create_task(self._read())
+
+    async def stop(self):
+        self._reader.cancel()
+        await self._pubsub.aclose()
+        await self._redis.aclose()
+
+    async def subscribe(self, channel: str):
+        self._channels.add(channel)
+        await self._pubsub.subscribe(channel)
+
+    async def unsubscribe(self, channel: str):
+        self._channels.discard(channel)
+        await self._pubsub.unsubscribe(channel)
+
+    async def publish(self, channel: str, message: str):
+        await self._redis.publish(channel, message)
+
+    async def _read(self):
+        while True:
+            try:
+                async for item in self._pubsub.listen():
+                    if item["type"] == "message":
+                        await self._handler(item["channel"], item["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("pub/sub reader failed, resubscribing: %s", e)
+                await asyncio.sleep(1)
+                try:
+                    await self._pubsub.subscribe(*self._channels)
+                except Exception:
+                    pass
+
+
+# WebSocket delivery limits (overridable from .env)
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "100"))  # queued messages before a client counts as too slow
+WS_SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", "10"))  # a single send taking longer evicts the client
+WS_PING_INTERVAL = float(os.getenv("WS_PING_INTERVAL", "25"))
+WS_IDLE_TIMEOUT = float(os.getenv("WS_IDLE_TIMEOUT", "70"))  # nothing received for this long closes the socket
+WS_PING_MESSAGE = json.dumps({"type": "ping"})
+
+
+class ClientConnection:
+    """One socket with its own bounded send queue, drained by a dedicated writer task."""
+
+    def __init__(self, manager, websocket: WebSocket, user_id: int):
+        self.manager = manager
+        self.websocket = websocket
+        self.user_id = user_id
+        self.queue: asyncio.Queue[str] = asyncio.Queue(maxsize=WS_SEND_QUEUE_SIZE)
+        self.last_seen = time.monotonic()
+        self.closed = False
+        self._writer = asyncio.create_task(self._write_loop())
+
+    def enqueue(self, message: str) -> bool:
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    async def _write_loop(self):
+        while True:
+            message = await self.queue.get()
+            try:
+                await asyncio.wait_for(self.websocket.send_text(message), WS_SEND_TIMEOUT)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Dead or stalled socket; never let it hold up anyone else
+                spawn_background(self.manager.evict(self, "send_failed", code=1011))
+                return
+            self.manager.messages_sent += 1
+            metrics.WS_SENT.inc()
+
+    async def close(self, code: int):
+        if self.closed:
+            return
+        self.closed = True
+        self._writer.cancel()
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass
+
+
+class ConnectionManager:
+    def __init__(self, backend):
+        # A user can have several sockets open (tabs, devices)
+        self.active_connections: dict[int, set[ClientConnection]] = {}
+        self.backend = backend
+        self.messages_sent = 0
+        self.messages_dropped = 0
+        self.evictions: dict[str, int] = {"slow_consumer": 0, "idle": 0, "send_failed": 0}
+        self._heartbeat = None
+
+    async def start(self):
+        self._heartbeat = asyncio.create_task(self._heartbeat_loop())
+
+    async def stop(self):
+        self._heartbeat.cancel()
+
+    async def connect(self, websocket: WebSocket, user_id: int) -> ClientConnection:
+        await websocket.accept()
+        client = ClientConnection(self, websocket, user_id)
+        clients = self.active_connections.setdefault(user_id, set())
+        clients.add(client)
+        metrics.WS_CONNECTIONS.inc()
+        if len(clients) == 1:
+            await self.backend.subscribe(user_channel(user_id))
+        return client
+
+    async def disconnect(self, client: ClientConnection, code: int = 1000):
+        await client.close(code)
+        clients = self.active_connections.get(client.user_id)
+        if clients is None or client not in clients:
+            return
+        clients.discard(client)
+        metrics.WS_CONNECTIONS.dec()
+        if not clients:
+            del self.active_connections[client.user_id]
+            await self.backend.unsubscribe(user_channel(client.user_id))
+
+    async def evict(self, client: ClientConnection, reason: str, code: int):
+        if client.closed:
+            return
+        self.evictions[reason] += 1
+        self.messages_dropped += client.queue.qsize()
+        metrics.WS_EVICTIONS.labels(reason).inc()
+        metrics.WS_DROPPED.inc(client.queue.qsize())
+        logger.info("Evicting websocket of user %s: %s", client.user_id, reason)
+        await self.disconnect(client, code)
 
     async def send_personal_message(self, message: str, user_id: int):
-        if user_id in self.active_connections:
-            await self.active_connections[user_id].send_text(message)
+        await self.backend.publish(user_channel(user_id), message)
 
     async def broadcast(self, message: str, exclude_user_id: int = None):
-        for user_id, connection in self.active_connections.items():
-            if user_id != exclude_user_id:
-                await connection.send_text(message)
-manager = ConnectionManager()
+        await self.backend.publish(
+            BROADCAST_CHANNEL,
+            json.dumps({"exclude_user_id": exclude_user_id, "message": message})
+        )
+
+    async def deliver(self, channel: str, message: str):
+        """Called by the backend for every message that reaches this process."""
+        if channel == BROADCAST_CHANNEL:
+            envelope = json.loads(message)
+            targets = [
+                client for user_id, clients in self.active_connections.items()
+                if user_id != envelope["exclude_user_id"]
+                for client in clients
+            ]
+            message = envelope["message"]
+            kind = "broadcast"
+        else:
+            user_id = int(channel.rsplit(":", 1)[1])
+            targets = list(self.active_connections.get(user_id, ()))
+            kind = "user"
+        metrics.WS_DELIVERIES.labels(kind).inc()
+        metrics.WS_FANOUT.labels(kind).inc(len(targets))
+        # Enqueueing never blocks; each writer task drains its own socket concurrently
+        for client in targets:
+            if not client.enqueue(message):
+                self.messages_dropped += 1
+                metrics.WS_DROPPED.inc()
+                await self.evict(client, "slow_consumer", code=1013)
+
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(WS_PING_INTERVAL)
+            now = time.monotonic()
+            for clients in list(self.active_connections.values()):
+                for client in list(clients):
+                    if now - client.last_seen > WS_IDLE_TIMEOUT:
+                        await self.evict(client, "idle", code=1001)
+                    elif not client.enqueue(WS_PING_MESSAGE):
+                        await self.evict(client, "slow_consumer", code=1013)
+
+    def stats(self) -> dict:
+        depths = [client.queue.qsize() for clients in self.active_connections.values() for client in clients]
+        return {
+            "users": len(self.active_connections),
+            "connections": len(depths),
+            "queued_messages": sum(depths),
+            "max_queue_depth": max(depths, default=0),
+            "messages_sent": self.messages_sent,
+            "messages_dropped": self.messages_dropped,
+            "evictions": self.evictions,
+        }
+
+
+pubsub = RedisPubSub(PUBSUB_URL) if PUBSUB_URL else InMemoryPubSub()
+manager = ConnectionManager(pubsub)
 
 class MessageBase(BaseModel):
     content: str
@@ -84,6 +325,49 @@ class Conversation(BaseModel):
     last_name: Optional[str] = None
     image: Optional[str] = None
 
+# Row classes for FastJSONResponse: fields in SELECT order, mirroring the
+# pydantic models that document the same endpoints.
+@dataclass
+class MessageRow:
+    __slots__ = ("id", "conversation_id", "sender_id", "content", "sent_at", "is_read")
+    id: int
+    conversation_id: int
+    sender_id: int
+    content: str
+    sent_at: datetime
+    is_read: bool
+
+@dataclass
+class ConversationRow:
+    __slots__ = (
+        "id", "tutor_id", "student_id", "public_id", "created_at", "updated_at", "last_message",
+        "unread_count", "last_message_content", "last_message_time", "first_name", "last_name", "image",
+    )
+    id: int
+    tutor_id: int
+    student_id: int
+    public_id: str
+    created_at: datetime
+    updated_at: datetime
+    last_message: Optional[str]
+    unread_count: int
+    last_message_content: Optional[str]
+    last_message_time: Optional[datetime]
+    first_name: str
+    last_name: str
+    image: Optional[str]
+
+@dataclass
+class TutorCard:
+    __slots__ = ("public_id", "name", "subject", "rating", "price", "image", "description")
+    public_id: str
+    name: str
+    subject: str
+    rating: float
+    price: float
+    image: str
+    description: str
+
 JWT_APP_ID = "your_app_id"
 JWT_APP_SECRET = "your_strong_secret_key"
 JWT_ALGORITHM = "HS256"
@@ -91,7 +375,6 @@ JWT_EXPIRE_MINUTES = 360
 JITSI_DOMAIN = os.getenv("JITSI_URL")
 logger = logging.getLogger(__name__)
 VERIFICATION_LINK_BASE = os.getenv("WEBSITE_URL")+"/verification"
-resend.api_key = "re_G2Vu17hG_Ek7xEERiZxXJ5QDhTBhRCt7E"
 # Pydantic models
 class UserLogin(BaseModel):
     email: str
@@ -172,14 +455,102 @@ class BookLessonRequest(BaseModel):
 # Initialize FastAPI app
 app = FastAPI()
 
+# The event loop keeps only weak references to tasks, so fire-and-forget ones live here
+_background_tasks: set = set()
+
+def spawn_background(coro) -> asyncio.Task:
+    """Runs coro as a task that is kept alive until it finishes."""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+def get_websocket_user(token: str) -> Optional[UserInDB]:
+    """The user a WebSocket access token belongs to; None when it is missing or invalid."""
+    try:
+        return get_current_user(token) if token else None
+    except HTTPException:
+        return None
+
 @app.websocket("/ws/{user_id}")
-async def websocket_endpoint(websocket: WebSocket, user_id: int):
-    await manager.connect(websocket, user_id)
+async def websocket_endpoint(websocket: WebSocket, user_id: int, token: str = Query("")):
+    # Browsers cannot set headers on WebSockets, so the access token comes as ?token=
+    user = await anyio.to_thread.run_sync(get_websocket_user, token)
+    if user is None or user.id != user_id:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    client = await manager.connect(websocket, user_id)
     try:
         while True:
-            await websocket.receive_text()  # keep alive
-    except WebSocketDisconnect:
-        await manager.disconnect(user_id)
+            await websocket.receive_text()  # pongs and anything else count as keep-alive
+            client.last_seen = time.monotonic()
+    except (WebSocketDisconnect, RuntimeError):
+        pass  # RuntimeError: the server already closed this socket (eviction)
+    finally:
+        await manager.disconnect(client)
+
+async def dispatch_pubsub_message(channel: str, message: str):
+    if channel.startswith("ws:"):
+        await manager.deliver(channel, message)
+    elif channel == SEARCH_CHANNEL:
+        schedule_tutor_reindex(int(message))
+    elif channel == LESSONS_CHANNEL:
+        user_id = int(message)
+        lesson_cache.invalidate(user_id)
+        # Every worker receives this, so each one notifies only its own sockets
+        await manager.deliver(user_channel(user_id), LESSONS_UPDATED_MESSAGE)
+    elif channel == USERS_CHANNEL:
+        user_cache.invalidate(user_id=int(message))
+
+@app.on_event("startup")
+async def start_pubsub():
+    await pubsub.start(dispatch_pubsub_message)
+    await pubsub.subscribe(SEARCH_CHANNEL)
+    await pubsub.subscribe(LESSONS_CHANNEL)
+    await pubsub.subscribe(USERS_CHANNEL)
+    await manager.start()
+
+@app.on_event("shutdown")
+async def stop_pubsub():
+    await manager.stop()
+    await pubsub.stop()
+
+class LimitRequestSize:
+    """Refuses bodies larger than one upload with 413.
+
+    A larger Content-Length is refused before anything is read. Otherwise the
+    bytes are counted as they arrive, so a chunked or understated body is cut
+    off there instead of being spooled to disk by the multipart parser first.
+    Registered before CORS so the 413 still carries CORS headers.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        max_bytes = UPLOAD_MAX_BYTES + UPLOAD_FORM_OVERHEAD
+        content_length = Headers(scope=scope).get("content-length", "")
+        if content_length.isdigit() and int(content_length) > max_bytes:
+            response = JSONResponse({"detail": "Request body too large"}, status_code=413)
+            return await response(scope, receive, send)
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_bytes:
+                    # Raised inside body parsing, so it is answered like any other HTTPException
+                    raise HTTPException(status_code=413, detail="Request body too large")
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+app.add_middleware(LimitRequestSize)
 
 app.add_middleware(
     CORSMiddleware,
@@ -187,8 +558,38 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+def route_label(scope) -> str:
+    """Route template (/tutors/{public_id}), mount path (/uploads) or "unmatched"; never the raw path."""
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    if "endpoint" in scope:
+        return scope.get("root_path") or "mount"
+    return "unmatched"
+
+# Outermost middleware, so rejected and CORS preflight requests are counted too
+@app.middleware("http")
+async def record_request_metrics(request, call_next):
+    metrics.IN_FLIGHT.inc()
+    started = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        metrics.IN_FLIGHT.dec()
+        route = route_label(request.scope)
+        metrics.REQUEST_LATENCY.labels(request.method, route).observe(time.perf_counter() - started)
+        metrics.REQUESTS.labels(request.method, route, str(status_code)).inc()
+
+@app.on_event("shutdown")
+async def mark_metrics_worker_exited():
+    metrics.worker_exited()
+
 # Database configuration
 DB_CONFIG = {
     'host': 'localhost',
@@ -203,8 +604,13 @@ SECRET_KEY = "your-secret-key-here"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_DAYS = 30
 
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing pool (overridable from .env)
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_MAX_PENDING = int(os.getenv("PASSWORD_MAX_PENDING", str(PASSWORD_WORKERS * 8)))  # 429 beyond this
+
+# Avatar derivative pool
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+IMAGE_MAX_PENDING = int(os.getenv("IMAGE_MAX_PENDING", str(IMAGE_WORKERS * 4)))  # 429 beyond this
 
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
@@ -212,22 +618,431 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
 # Ensure the uploads directory exists
 UPLOAD_FOLDER = "uploads"
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(5 * 1024 * 1024)))  # per file, 413 beyond this
+UPLOAD_FORM_OVERHEAD = 64 * 1024  # multipart boundaries and headers around the file
+UPLOAD_CHUNK_SIZE = 256 * 1024
+UPLOAD_URL_PREFIX = "/uploads/"
+UPLOAD_GC_INTERVAL = int(os.getenv("UPLOAD_GC_INTERVAL", "3600"))  # seconds between garbage collection passes
+UPLOAD_GC_GRACE = int(os.getenv("UPLOAD_GC_GRACE", "86400"))  # unreferenced blobs are kept this long
+
+class ImmutableStaticFiles(StaticFiles):
+    """StaticFiles that lets clients cache content-addressed files forever.
+
+    Their names are content hashes (see blobstore.py), which double as strong
+    ETags. FileResponse answers Range/If-Range; is_not_modified answers
+    If-None-Match/If-Modified-Since. Legacy file names keep the default headers.
+    """
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        response = FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+        name = os.path.relpath(full_path, self.directory).replace(os.sep, "/")
+        tag = blobstore.etag_of(name)
+        if tag:
+            response.headers["etag"] = f'"{tag}"'
+            response.headers["cache-control"] = "public, max-age=31536000, immutable"
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
 
 # Serve the uploads folder
-app.mount("/uploads", StaticFiles(directory=UPLOAD_FOLDER), name="uploads")
+app.mount("/uploads", ImmutableStaticFiles(directory=UPLOAD_FOLDER), name="uploads")
+
+# Connection pool settings (overridable from .env)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))  # seconds to wait for a free connection
+DB_POOL_MAX_LIFETIME = float(os.getenv("DB_POOL_MAX_LIFETIME", "1800"))  # recycle connections older than this
+DB_POOL_PING_AFTER = float(os.getenv("DB_POOL_PING_AFTER", "30"))  # ping connections idle longer than this
+DB_QUERY_TIMEOUT_MS = int(os.getenv("DB_QUERY_TIMEOUT_MS", "10000"))  # server-side limit for SELECTs, 0 disables
+# Blocking endpoints (everything that talks to MySQL) run in anyio's worker threads.
+# Keep this close to DB_POOL_SIZE so requests queue for a thread instead of piling up on the pool.
+DB_WORKER_THREADS = int(os.getenv("DB_WORKER_THREADS", str(DB_POOL_SIZE * 2)))
+
+
+class TimedCursor:
+    """Cursor proxy recording every statement in db_query_duration_seconds."""
+
+    def __init__(self, raw):
+        self._raw = raw
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def execute(self, operation, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self._raw.execute(operation, *args, **kwargs)
+        finally:
+            metrics.observe_query(operation, time.perf_counter() - started)
+
+    def executemany(self, operation, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self._raw.executemany(operation, *args, **kwargs)
+        finally:
+            metrics.observe_query(operation, time.perf_counter() - started)
+
+
+class PooledConnection:
+    """Proxy around a pooled mysql connection. close() hands it back to the pool."""
+
+    def __init__(self, pool, raw, created_at: float):
+        self._pool = pool
+        self._raw = raw
+        self._created_at = created_at
+        self._released = False
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def cursor(self, *args, **kwargs):
+        return TimedCursor(self._raw.cursor(*args, **kwargs))
+
+    def close(self):
+        if not self._released:
+            self._released = True
+            self._pool.release(self._raw, self._created_at)
+
+
+class DBPool:
+    WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, float("inf"))
+
+    def __init__(self, config: dict, size: int, timeout: float, max_lifetime: float, ping_after: float):
+        self.config = config
+        self.size = size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.ping_after = ping_after
+        self._idle = deque()  # (connection, created_at, last_used_at)
+        self._cond = threading.Condition()
+        self._open = 0
+        self.checked_out = 0
+        self.waiting = 0
+        self.created = 0
+        self.recycled = 0
+        self.failed_health_checks = 0
+        self.timeouts = 0
+        self._wait_buckets = [0] * len(self.WAIT_BUCKETS)
+        self._wait_sum = 0.0
+        self._wait_count = 0
+
+    def _connect(self):
+        raw = mysql.connector.connect(**self.config)
+        if DB_QUERY_TIMEOUT_MS:
+            cursor = raw.cursor()
+            try:
+                cursor.execute("SET SESSION MAX_EXECUTION_TIME = %s", (DB_QUERY_TIMEOUT_MS,))
+            except Error:
+                pass  # not supported by this server (e.g. MariaDB)
+            finally:
+                cursor.close()
+        self.created += 1
+        return raw, time.monotonic()
+
+    def _discard(self, raw):
+        try:
+            raw.close()
+        except Error:
+            pass
+
+    def _observe_wait(self, seconds: float):
+        for i, bound in enumerate(self.WAIT_BUCKETS):
+            if seconds <= bound:
+                self._wait_buckets[i] += 1
+                break
+        self._wait_sum += seconds
+        self._wait_count += 1
+
+    def get_connection(self) -> PooledConnection:
+        started = time.monotonic()
+        deadline = started + self.timeout
+        with self._cond:
+            self.waiting += 1
+            try:
+                while not self._idle and self._open >= self.size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.timeouts += 1
+                        raise HTTPException(status_code=503, detail="Database is busy, try again")
+                    self._cond.wait(remaining)
+                if self._idle:
+                    raw, created_at, last_used_at = self._idle.pop()
+                else:
+                    # Reserve a slot, the actual connect happens outside the lock
+                    raw, created_at, last_used_at = None, 0.0, 0.0
+                    self._open += 1
+            finally:
+                self.waiting -= 1
+            self.checked_out += 1
+            self._observe_wait(time.monotonic() - started)
+
+        try:
+            now = time.monotonic()
+            if raw is not None and now - created_at > self.max_lifetime:
+                self._discard(raw)
+                self.recycled += 1
+                raw = None
+            elif raw is not None and now - last_used_at > self.ping_after:
+                try:
+                    raw.ping(reconnect=False)
+                except Error:
+                    self._discard(raw)
+                    self.failed_health_checks += 1
+                    raw = None
+            if raw is None:
+                raw, created_at = self._connect()
+        except Error:
+            with self._cond:
+                self._open -= 1
+                self.checked_out -= 1
+                self._cond.notify()
+            raise HTTPException(status_code=500, detail="Database connection error")
+        return PooledConnection(self, raw, created_at)
+
+    def release(self, raw, created_at: float):
+        keep = time.monotonic() - created_at <= self.max_lifetime
+        if keep:
+            try:
+                # End whatever transaction the request left open so the next
+                # borrower does not inherit locks or a stale snapshot.
+                if raw.unread_result:
+                    raw.consume_results()
+                raw.rollback()
+            except Error:
+                keep = False
+        if not keep:
+            self._discard(raw)
+        with self._cond:
+            self.checked_out -= 1
+            if keep:
+                self._idle.append((raw, created_at, time.monotonic()))
+            else:
+                self._open -= 1
+            self._cond.notify()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "size": self.size,
+                "open": self._open,
+                "idle": len(self._idle),
+                "checked_out": self.checked_out,
+                "waiting": self.waiting,
+                "created": self.created,
+                "recycled": self.recycled,
+                "failed_health_checks": self.failed_health_checks,
+                "timeouts": self.timeouts,
+                "wait_seconds": {
+                    "buckets": {
+                        ("+Inf" if bound == float("inf") else str(bound)): count
+                        for bound, count in zip(self.WAIT_BUCKETS, self._wait_buckets)
+                    },
+                    "sum": self._wait_sum,
+                    "count": self._wait_count,
+                },
+            }
+
+
+db_pool = DBPool(DB_CONFIG, DB_POOL_SIZE, DB_POOL_TIMEOUT, DB_POOL_MAX_LIFETIME, DB_POOL_PING_AFTER)
+
+def get_db_connection() -> PooledConnection:
+    return db_pool.get_connection()
+
+@app.on_event("startup")
+async def configure_worker_threads():
+    anyio.to_thread.current_default_thread_limiter().total_tokens = DB_WORKER_THREADS
 
-def get_db_connection():
+def get_db():
+    """FastAPI dependency: one pooled connection per request."""
+    conn = db_pool.get_connection()
     try:
-        connection = mysql.connector.connect(**DB_CONFIG)
-        return connection
-    except Error as e:
-        raise HTTPException(status_code=500, detail="Database connection error")
+        yield conn
+    finally:
+        conn.close()
+
+# Authenticated user cache (overridable from .env)
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "2048"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))  # seconds; bounds staleness if an invalidation is lost
+USERS_CHANNEL = "users:changed"  # payload: id of a user whose row changed
+
+
+class LRUCache:
+    """Thread-safe LRU cache whose entries expire ttl seconds after put (None: only evicted)."""
+
+    def __init__(self, max_size: int, ttl: Optional[float] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()  # key -> (monotonic deadline, value)
+        self._lock = threading.RLock()  # reentrant so subclasses can extend methods under it
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value, ttl: Optional[float] = None):
+        """Stores value for ttl seconds, the cache's own ttl when not given."""
+        ttl = self.ttl if ttl is None else ttl
+        deadline = time.monotonic() + ttl if ttl is not None else float("inf")
+        with self._lock:
+            self._entries[key] = (deadline, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+                self.invalidations += 1
+
+    def _remove(self, key):
+        """Drops an entry; the one place subclasses keeping side indexes need to hook."""
+        del self._entries[key]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+class UserCache(LRUCache):
+    """UserInDB objects keyed by lower-cased email, invalidated by email or user id."""
+
+    def __init__(self, max_size: int, ttl: float):
+        super().__init__(max_size, ttl)
+        self._emails_by_id: dict[int, str] = {}
+        self._epoch = 0  # bumped by every invalidation
+
+    def get(self, email: str) -> Optional[UserInDB]:
+        return super().get(email.lower())
+
+    def epoch(self) -> int:
+        with self._lock:
+            return self._epoch
+
+    def put(self, user: UserInDB, epoch: int):
+        """Stores a user read after epoch() returned epoch, unless an invalidation raced the read."""
+        key = user.email.lower()
+        with self._lock:
+            if epoch != self._epoch:
+                return
+            super().put(key, user)
+            self._emails_by_id[user.id] = key
+
+    def invalidate(self, user_id: Optional[int] = None, email: Optional[str] = None):
+        with self._lock:
+            # Bumped even when the user is not cached: a read of it may be in flight
+            self._epoch += 1
+            key = email.lower() if email else self._emails_by_id.get(user_id)
+            if key:
+                super().invalidate(key)
+
+    def _remove(self, key: str):
+        _, user = self._entries.pop(key)
+        if self._emails_by_id.get(user.id) == key:
+            del self._emails_by_id[user.id]
+
+
+user_cache = UserCache(USER_CACHE_SIZE, USER_CACHE_TTL)
 
-def verify_password(plain_password: str, hashed_password: str):
-    return pwd_context.verify(plain_password, hashed_password)
+def publish_user_changed(user_id: int):
+    """Called from sync code after commit; every worker drops the user from its cache."""
+    user_cache.invalidate(user_id=user_id)  # this worker at once, the others via pub/sub
+    anyio.from_thread.run(pubsub.publish, USERS_CHANNEL, str(user_id))
 
-def get_password_hash(password: str):
-    return pwd_context.hash(password)
+class PasswordHasher(procpool.ProcessPool):
+    """Runs bcrypt in a bounded process pool so it never blocks the event loop."""
+
+    def __init__(self, workers: int, max_pending: int):
+        super().__init__("passwords", workers, max_pending, "Too many requests, try again shortly")
+        self.rehashed = 0
+
+    async def hash(self, password: str) -> str:
+        return await self.run(passwords.hash_password, password)
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str):
+        return await self.run(passwords.verify_and_update, plain_password, hashed_password)
+
+    def stats(self) -> dict:
+        return {**super().stats(), "rehashed": self.rehashed}
+
+
+password_hasher = PasswordHasher(PASSWORD_WORKERS, PASSWORD_MAX_PENDING)
+
+@app.on_event("startup")
+async def start_password_hasher():
+    password_hasher.start()
+
+@app.on_event("shutdown")
+async def stop_password_hasher():
+    password_hasher.shutdown()
+
+class AvatarRenderer(procpool.ProcessPool):
+    """Renders avatar derivatives in a bounded process pool so decoding never blocks the event loop."""
+
+    def __init__(self, workers: int, max_pending: int):
+        super().__init__("images", workers, max_pending, "Too many uploads, try again shortly")
+        self.rendered = 0
+        self.reused = 0
+        self.failed = 0
+
+    async def render(self, folder: str, filename: str) -> dict:
+        """{size: filename} of the derivatives; 415 when the file does not decode as an image.
+
+        Derivatives that already exist are reused: content-addressed sources
+        never change, so neither do they.
+        """
+        existing = {size: images.avatar_name(filename, size) for size in images.AVATAR_SIZES}
+        if all(os.path.exists(os.path.join(folder, name)) for name in existing.values()):
+            self.reused += 1
+            return existing
+        try:
+            names = await self.run(images.make_avatars, folder, filename)
+        except HTTPException:
+            raise
+        except Exception as e:
+            self.failed += 1
+            logger.info("Avatar rendering failed for %s: %s", filename, e)
+            raise HTTPException(status_code=415, detail="Unreadable image")
+        self.rendered += 1
+        return names
+
+    def stats(self) -> dict:
+        return {**super().stats(), "rendered": self.rendered, "reused": self.reused, "failed": self.failed}
+
+
+avatar_renderer = AvatarRenderer(IMAGE_WORKERS, IMAGE_MAX_PENDING)
+
+@app.on_event("startup")
+async def start_avatar_renderer():
+    avatar_renderer.start()
+
+@app.on_event("shutdown")
+async def stop_avatar_renderer():
+    avatar_renderer.shutdown()
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -235,7 +1050,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-async def get_user(email: str) -> Optional[UserInDB]:
+def get_user(email: str) -> Optional[UserInDB]:
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
     try:
@@ -250,13 +1065,31 @@ async def get_user(email: str) -> Optional[UserInDB]:
         cursor.close()
         conn.close()
 
+def update_password_hash(user: UserInDB, new_hash: str):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("UPDATE users SET password_hash = %s WHERE id = %s", (new_hash, user.id))
+        conn.commit()
+        publish_user_changed(user.id)
+    finally:
+        cursor.close()
+        conn.close()
+
 async def authenticate_user(email: str, password: str):
-    user = await get_user(email)
-    if not user or not verify_password(password, user.password_hash):
+    user = await anyio.to_thread.run_sync(get_user, email)
+    if not user:
         return False
+    valid, new_hash = await password_hasher.verify_and_update(password, user.password_hash)
+    if not valid:
+        return False
+    if new_hash:
+        # Cost factor changed since this hash was made; upgrade it transparently
+        await anyio.to_thread.run_sync(update_password_hash, user, new_hash)
+        password_hasher.rehashed += 1
     return user
 
-async def get_current_user(token: str = Depends(oauth2_scheme)):    
+def get_current_user(token: str = Depends(oauth2_scheme)):    
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])        
         email = payload.get("sub")
@@ -265,7 +1098,12 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         if not email or not user_type:
             raise HTTPException(status_code=401, detail="Invalid token payload")
             
-        user = await get_user(email)
+        user = user_cache.get(email)
+        if user is None:
+            epoch = user_cache.epoch()
+            user = get_user(email)
+            if user:
+                user_cache.put(user, epoch)
         
         if not user:
             print(f"ERROR: User not found for email: {email}", flush=True)
@@ -336,7 +1174,10 @@ async def register_user(user_data: dict):
                 detail=f"Missing tutor fields: {', '.join(missing_tutor)}"
             )
 
-    hashed_password = get_password_hash(user_data['password'])
+    hashed_password = await password_hasher.hash(user_data['password'])
+    return await anyio.to_thread.run_sync(create_user, user_data, hashed_password)
+
+def create_user(user_data: dict, hashed_password: str):
     public_id = str(uuid.uuid4())  # Generate a new UUID for public_id
     conn = get_db_connection()
     cursor = conn.cursor()
@@ -389,19 +1230,106 @@ async def register_user(user_data: dict):
     finally:
         cursor.close()
         conn.close()
+
 @app.get("/users/me")
 async def read_users_me(current_user: UserInDB = Depends(get_current_active_user)):
+    # Served from the authenticated (cached) user, minus sensitive data
+    return current_user.model_dump(exclude={"password_hash"})
+
+# Leading bytes of accepted image formats -> stored extension
+IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+    (b"GIF87a", ".gif"),
+    (b"GIF89a", ".gif"),
+)
+
+
+def sniff_image_extension(head: bytes) -> Optional[str]:
+    """Extension for the image format in head, judged by content rather than the client's claims."""
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp"
+    for signature, extension in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    return None
+
+async def save_upload(file: UploadFile, folder: str, max_bytes: int) -> str:
+    """Streams an uploaded image into the blob store in chunks and returns its name.
+
+    Data goes to a temp file in the same folder that is renamed to its content
+    hash only once complete, so readers never see partial files; content that
+    is already stored is not written twice. Raises 415 for content that is not
+    an image and 413 as soon as max_bytes is exceeded.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=folder, suffix=".part")
+    try:
+        extension = None
+        size = 0
+        digest = hashlib.sha256()
+        with os.fdopen(fd, "wb") as out:
+            def write(chunk: bytes):
+                out.write(chunk)
+                digest.update(chunk)
+
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                if extension is None:
+                    extension = sniff_image_extension(chunk)
+                    if extension is None:
+                        raise HTTPException(status_code=415, detail="Unsupported image type")
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(status_code=413, detail=f"File larger than {max_bytes} bytes")
+                await anyio.to_thread.run_sync(write, chunk)
+        if extension is None:
+            raise HTTPException(status_code=400, detail="Empty file")
+        name = blobstore.blob_name(digest.hexdigest(), extension)
+        await anyio.to_thread.run_sync(blobstore.place, folder, tmp_path, name)
+        return name
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+def set_profile_picture(user_id: int, name: str, thumbnail_name: str) -> bool:
+    """Points the user at a stored blob and drops the reference to their previous picture.
+
+    Returns False when garbage collection removed the files between storing
+    and referencing them; nothing is changed then.
+    """
     conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
+    cursor = conn.cursor()
     try:
-        cursor.execute("SELECT * FROM users WHERE id = %s", (current_user.id,))
-        user_data = cursor.fetchone()
-        if not user_data:
-            raise HTTPException(status_code=404, detail="User details not found")
-        
-        # Remove sensitive data
-        user_data.pop('password_hash', None)
-        return user_data
+        cursor.execute("SELECT profile_picture_url FROM users WHERE id = %s FOR UPDATE", (user_id,))
+        previous = cursor.fetchone()[0]
+        blobstore.acquire(cursor, name)
+        if not all(os.path.exists(os.path.join(UPLOAD_FOLDER, n)) for n in (name, thumbnail_name)):
+            conn.rollback()
+            return False
+        if previous and previous.startswith(UPLOAD_URL_PREFIX):
+            blobstore.release(cursor, previous[len(UPLOAD_URL_PREFIX):])
+        cursor.execute(
+            "UPDATE users SET profile_picture_url = %s, profile_thumbnail_url = %s WHERE id = %s",
+            (UPLOAD_URL_PREFIX + name, UPLOAD_URL_PREFIX + thumbnail_name, user_id)
+        )
+        conn.commit()
+        return True
+    except Error:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+def discard_upload(name: str):
+    """Leaves an unused blob to garbage collection (a no-op if someone references it)."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        blobstore.track(cursor, name)
+        conn.commit()
+    except Error as e:
+        logger.warning("Could not register %s for garbage collection: %s", name, e)
     finally:
         cursor.close()
         conn.close()
@@ -411,29 +1339,49 @@ async def upload_profile_picture(
     file: UploadFile = File(...),
     current_user: UserInDB = Depends(get_current_active_user)
 ):
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_")
-    filename = timestamp + file.filename
-    file_path = os.path.join(UPLOAD_FOLDER, filename)
-    
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    name = await save_upload(file, UPLOAD_FOLDER, UPLOAD_MAX_BYTES)
     try:
-        cursor.execute(
-            "UPDATE users SET profile_picture_url = %s WHERE id = %s",
-            (f"/uploads/{filename}", current_user.id)
-        )
-        conn.commit()
-        return JSONResponse({"file_url": f"/uploads/{filename}"})
-    except Error as e:
-        conn.rollback()
+        avatars = await avatar_renderer.render(UPLOAD_FOLDER, name)
+        if not await anyio.to_thread.run_sync(set_profile_picture, current_user.id, name, avatars[images.THUMBNAIL_SIZE]):
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Upload collided with cleanup, try again",
+                headers={"Retry-After": "1"},
+            )
+    except (HTTPException, Error) as e:
+        await anyio.to_thread.run_sync(discard_upload, name)
+        if isinstance(e, HTTPException):
+            raise
         raise HTTPException(status_code=500, detail=str(e))
+    user_cache.invalidate(user_id=current_user.id)
+    await pubsub.publish(USERS_CHANNEL, str(current_user.id))
+    return JSONResponse({
+        "file_url": UPLOAD_URL_PREFIX + name,
+        "thumbnail_url": UPLOAD_URL_PREFIX + avatars[images.THUMBNAIL_SIZE],
+        "avatars": {size: UPLOAD_URL_PREFIX + avatar for size, avatar in avatars.items()},
+    })
+
+def collect_upload_garbage() -> int:
+    conn = get_db_connection()
+    try:
+        return blobstore.collect_garbage(conn, UPLOAD_FOLDER, UPLOAD_GC_GRACE)
     finally:
-        cursor.close()
         conn.close()
 
+async def upload_gc_loop():
+    while True:
+        try:
+            removed = await anyio.to_thread.run_sync(collect_upload_garbage)
+            if removed:
+                logger.info("Removed %d unreferenced uploads", removed)
+        except Exception as e:
+            logger.warning("upload garbage collection failed: %s", e)
+        await asyncio.sleep(UPLOAD_GC_INTERVAL)
+
+@app.on_event("startup")
+async def start_upload_gc():
+    spawn_background(upload_gc_loop())
+
 @app.get("/balance")
 async def get_user_balance(current_user: UserInDB = Depends(get_current_active_user)):
     return {"balance": current_user.balance}
@@ -442,39 +1390,29 @@ async def get_user_balance(current_user: UserInDB = Depends(get_current_active_u
 async def get_own_bio(current_user: UserInDB = Depends(get_current_active_user)):
     if current_user.user_type != "tutor":
         raise HTTPException(status_code=403, detail="Only tutors have a bio")
-
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    try:
-        cursor.execute("SELECT bio FROM users WHERE id = %s AND user_type = 'tutor'", (current_user.id,))
-        result = cursor.fetchone()
-        if not result:
-            raise HTTPException(status_code=404, detail="Tutor not found")
-        return {"bio": result["bio"]}
-    finally:
-        cursor.close()
-        conn.close()
+    return {"bio": current_user.bio}
 
 @app.post("/users/change_bio")
-async def change_own_bio(
+def change_own_bio(
     bio_data: BioUpdate,
-    current_user: UserInDB = Depends(get_current_active_user)
+    current_user: UserInDB = Depends(get_current_active_user),
+    conn: PooledConnection = Depends(get_db)
 ):
     if current_user.user_type != "tutor":
         raise HTTPException(status_code=403, detail="Only tutors can update their bio")
 
-    conn = get_db_connection()
     cursor = conn.cursor()
     try:
         cursor.execute("UPDATE users SET bio = %s WHERE id = %s", (bio_data.bio, current_user.id))
         conn.commit()
+        publish_user_changed(current_user.id)
+        publish_tutor_changed(current_user.id)
         return {"message": "Bio updated successfully"}
     except Error as e:
         conn.rollback()
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         cursor.close()
-        conn.close()
 
 @app.post("/generate-jitsi-token")
 async def generate_jitsi_token(
@@ -485,31 +1423,11 @@ async def generate_jitsi_token(
         # 1. Generate random room ID
         room = secrets.token_hex(16)
         
-        # 2. Calculate timestamps
-        now = datetime.utcnow()
-        expire = now + timedelta(minutes=JWT_EXPIRE_MINUTES)
+        # 2. Calculate expiry
+        expire = datetime.utcnow() + timedelta(minutes=JWT_EXPIRE_MINUTES)
         
-        # 3. Create payload with public_id
-        payload = {
-            "typ": "JWT",
-            "alg": "HS256",
-            "aud": JWT_APP_ID,
-            "iss": JWT_APP_ID,
-            "sub": current_user.public_id,  # Using public_id here
-            "room": room,
-            "iat": int(now.timestamp()),
-            "nbf": int(now.timestamp()),
-            "exp": int(expire.timestamp()),
-            "context": {
-                "user": {
-                    "name": current_user.first_name or "Participant",
-                    "id": current_user.public_id  # Additional identifier
-                }
-            }
-        }
-
-        # 4. Generate token
-        token = jwt.encode(payload, JWT_APP_SECRET, algorithm=JWT_ALGORITHM)
+        # 3. Sign the token for the user's public_id
+        token = sign_jitsi_token(current_user, room, expire)
         
         return {
             "jitsi_token": token,
@@ -554,36 +1472,252 @@ async def get_all_subjects():
         'Статистика'
     ]
 
+SEARCH_CHANNEL = "search:tutors"  # payload: id of a tutor whose searchable fields changed
+SEARCH_MAX_RESULTS = 1000  # relevance sort only; the other sorts filter on every match
+SEARCH_FIELD_WEIGHTS = {"name": 3.0, "subject": 2.0, "profile_title": 1.5, "bio": 1.0}
+SEARCH_PREFIX_PENALTY = 0.6  # prefix-only matches rank below whole-word matches
+SEARCHABLE_TUTORS_QUERY = """
+    SELECT id, first_name, last_name, subject, profile_title, bio
+    FROM users
+    WHERE is_active = TRUE
+      AND user_type = 'tutor'
+      AND verification_status = 'verified'
+"""
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def _strip_latin_accents(token: str) -> str:
+    # Decomposing would also split Cyrillic й into и + breve, so only drop marks on Latin letters
+    chars = []
+    for c in unicodedata.normalize("NFD", token):
+        if unicodedata.combining(c) and chars and chars[-1] < "\u0250":
+            continue
+        chars.append(c)
+    return unicodedata.normalize("NFC", "".join(chars))
+
+
+def normalize_search_text(text: str) -> list[str]:
+    text = unicodedata.normalize("NFKC", text).casefold().replace("ё", "е")
+    return [
+        token if token.isascii() else _strip_latin_accents(token)
+        for token in _TOKEN_RE.findall(text)
+    ]
+
+
+class TutorSearchIndex:
+    """In-memory inverted index over verified tutors with prefix matching and weighted ranking."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings: dict[str, dict[int, float]] = {}  # term -> {tutor_id: field weight}
+        self._terms: list[str] = []  # sorted, for prefix lookups
+        self._docs: dict[int, list[str]] = {}  # tutor_id -> its terms, for removal
+        self.ready = False
+
+    def _add(self, row: dict):
+        weights: dict[str, float] = {}
+        fields = (
+            ("name", f"{row['first_name']} {row['last_name']}"),
+            ("subject", row["subject"]),
+            ("profile_title", row["profile_title"]),
+            ("bio", row["bio"]),
+        )
+        for field, text in fields:
+            for token in normalize_search_text(text or ""):
+                weights[token] = max(weights.get(token, 0.0), SEARCH_FIELD_WEIGHTS[field])
+        for token, weight in weights.items():
+            posting = self._postings.get(token)
+            if posting is None:
+                posting = self._postings[token] = {}
+                bisect.insort(self._terms, token)
+            posting[row["id"]] = weight
+        self._docs[row["id"]] = list(weights)
+
+    def _remove(self, tutor_id: int):
+        for token in self._docs.pop(tutor_id, ()):
+            posting = self._postings[token]
+            del posting[tutor_id]
+            if not posting:
+                del self._postings[token]
+                del self._terms[bisect.bisect_left(self._terms, token)]
+
+    def rebuild(self, rows: list[dict]):
+        with self._lock:
+            self._postings, self._terms, self._docs = {}, [], {}
+            for row in rows:
+                self._add(row)
+            self.ready = True
+
+    def upsert(self, tutor_id: int, row: Optional[dict]):
+        """Re-indexes one tutor; row=None removes them (no longer searchable)."""
+        with self._lock:
+            self._remove(tutor_id)
+            if row is not None:
+                self._add(row)
+
+    def search(self, query: str, limit: Optional[int] = None) -> list[int]:
+        """Tutor ids matching every query word (as a word prefix), best first; all of them without a limit."""
+        tokens = normalize_search_text(query)
+        if not tokens:
+            return []
+        with self._lock:
+            scores: Optional[dict[int, float]] = None
+            for token in tokens:
+                matches: dict[int, float] = {}
+                i = bisect.bisect_left(self._terms, token)
+                while i < len(self._terms) and self._terms[i].startswith(token):
+                    term = self._terms[i]
+                    boost = 1.0 if term == token else SEARCH_PREFIX_PENALTY
+                    for tutor_id, weight in self._postings[term].items():
+                        if weight * boost > matches.get(tutor_id, 0.0):
+                            matches[tutor_id] = weight * boost
+                    i += 1
+                if scores is None:
+                    scores = matches
+                else:
+                    scores = {tid: scores[tid] + score for tid, score in matches.items() if tid in scores}
+                if not scores:
+                    return []
+        return sorted(scores, key=lambda tid: (-scores[tid], tid))[:limit]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"ready": self.ready, "tutors": len(self._docs), "terms": len(self._terms)}
+
+
+tutor_search_index = TutorSearchIndex()
+
+def load_tutor_search_index():
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(SEARCHABLE_TUTORS_QUERY)
+        tutor_search_index.rebuild(cursor.fetchall())
+    finally:
+        cursor.close()
+        conn.close()
+
+def reindex_tutor(tutor_id: int):
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(SEARCHABLE_TUTORS_QUERY + " AND id = %s", (tutor_id,))
+        tutor_search_index.upsert(tutor_id, cursor.fetchone())
+    finally:
+        cursor.close()
+        conn.close()
+
+def schedule_tutor_reindex(tutor_id: int):
+    spawn_background(anyio.to_thread.run_sync(reindex_tutor, tutor_id))
+
+def publish_tutor_changed(tutor_id: int):
+    """Called from sync handlers after commit; every worker re-indexes the tutor."""
+    anyio.from_thread.run(pubsub.publish, SEARCH_CHANNEL, str(tutor_id))
+
+@app.on_event("startup")
+async def start_tutor_search_index():
+    # Built in the background; search falls back to LIKE until it is ready
+    spawn_background(anyio.to_thread.run_sync(load_tutor_search_index))
+
+TUTORS_PAGE_SIZE = 20
+TUTORS_MAX_PAGE_SIZE = 100
+# sort name -> (column, direction); each is backed by an idx_tutor_search_* index
+TUTOR_SEARCH_SORTS = {
+    "price": ("hourly_rate", "ASC"),
+    "rating": ("rating", "DESC"),
+    "reviews": ("total_reviews", "DESC"),
+}
+TUTOR_SORT_KEYS = {"price": 4, "rating": 3, "reviews": 8}  # positions in TUTOR_CARDS_QUERY rows
+
+# The first seven columns are a TutorCard; id and total_reviews are for paging only
+TUTOR_CARDS_QUERY = """
+    SELECT 
+        public_id,
+        CONCAT(first_name, ' ', last_name) as name,
+        subject,
+        rating,
+        hourly_rate as price,
+        COALESCE(profile_thumbnail_url, profile_picture_url, '/uploads/default_pfp.webp') as image,
+        COALESCE(profile_title, '') as description,
+        id,
+        total_reviews
+    FROM users
+    WHERE is_active = TRUE
+      AND user_type = 'tutor'
+      AND verification_status = 'verified'
+"""
+
+
+def encode_page_cursor(values: list) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values, default=str).encode()).decode()
+
+def decode_page_cursor(cursor: str) -> tuple[str, list]:
+    """(sort, position): ["relevance", offset] or [sort, sort value, id]; 400 for anything else.
+
+    Cursors carry their sort, so every worker continues a listing the way it
+    started, whatever the request's sort parameter resolves to there.
+    """
+    try:
+        sort, *values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if sort == "relevance":
+            offset, = values
+            if type(offset) is int and offset >= 0:
+                return sort, [offset]
+        elif sort in TUTOR_SEARCH_SORTS:
+            value, tutor_id = values
+            if type(tutor_id) is int and type(value) in (int, float, str) and Decimal(str(value)).is_finite():
+                return sort, [Decimal(str(value)), tutor_id]
+    except (ValueError, TypeError, ArithmeticError):
+        pass
+    raise HTTPException(status_code=400, detail="Invalid cursor")
+
 @app.get("/tutors/search", response_model=list[Tutor])
-async def search_tutors(
+def search_tutors(
     search_term: Optional[str] = Query(None, description="Search by name or subject"),
     subject: Optional[str] = Query(None, description="Filter by subject"),
     max_price: Optional[float] = Query(100, description="Maximum hourly rate"),
-    current_user: UserInDB = Depends(get_current_active_user)
+    min_rating: Optional[float] = Query(None, description="Minimum rating"),
+    sort: Optional[str] = Query(None, description="relevance, price, rating or reviews"),
+    limit: int = Query(TUTORS_PAGE_SIZE, ge=1, le=TUTORS_MAX_PAGE_SIZE),
+    page_cursor: Optional[str] = Query(None, alias="cursor", description="X-Next-Cursor of the previous page"),
+    current_user: UserInDB = Depends(get_current_active_user),
+    conn: PooledConnection = Depends(get_db)
 ):
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
+    cursor = conn.cursor()
 
     try:
-        query = """
-            SELECT 
-                public_id,
-                CONCAT(first_name, ' ', last_name) as name,
-                subject,
-                rating,
-                hourly_rate as price,
-                COALESCE(profile_picture_url, '/uploads/default_pfp.webp') as image,
-                COALESCE(profile_title, '') as description
-            FROM users
-            WHERE is_active = TRUE
-              AND user_type = 'tutor'
-              AND verification_status = 'verified'
-        """
+        query = TUTOR_CARDS_QUERY
 
         params = []
         conditions = []
-
-        if search_term:
+        ranked_ids = None
+        use_index = bool(search_term) and tutor_search_index.ready
+        after = None
+
+        if page_cursor:
+            sort, after = decode_page_cursor(page_cursor)
+            if sort == "relevance" and not use_index:
+                if not search_term:
+                    raise HTTPException(status_code=400, detail="Invalid cursor")
+                # Issued by a worker whose index is ready; this one is still building its own
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Search index is warming up, try again shortly",
+                    headers={"Retry-After": "1"},
+                )
+        elif sort is None or (sort == "relevance" and not use_index):
+            sort = "relevance" if use_index else "price"
+        if sort != "relevance" and sort not in TUTOR_SEARCH_SORTS:
+            raise HTTPException(status_code=400, detail=f"Unknown sort: {sort}")
+
+        if use_index:
+            # Only relevance pages through the ranking; keyset sorts need every match
+            ranked_ids = tutor_search_index.search(search_term, SEARCH_MAX_RESULTS if sort == "relevance" else None)
+            if not ranked_ids:
+                return []
+            conditions.append(f"id IN ({', '.join(['%s'] * len(ranked_ids))})")
+            params.extend(ranked_ids)
+        elif search_term:
             conditions.append("""
                 (CONCAT(first_name, ' ', last_name) LIKE %s 
                 OR subject LIKE %s)
@@ -598,28 +1732,58 @@ async def search_tutors(
             conditions.append("hourly_rate <= %s")
             params.append(max_price)
 
-        if conditions:
-            query += " AND " + " AND ".join(conditions)
-
-        query += " ORDER BY hourly_rate ASC"
-
-        cursor.execute(query, params)
-        tutors = cursor.fetchall()
-        return tutors
+        if min_rating:
+            conditions.append("rating >= %s")
+            params.append(min_rating)
+
+        next_cursor = None
+
+        if sort == "relevance":
+            # Ranked candidates are capped at SEARCH_MAX_RESULTS; page through them by position
+            if conditions:
+                query += " AND " + " AND ".join(conditions)
+            cursor.execute(query, params)
+            rank = {tutor_id: i for i, tutor_id in enumerate(ranked_ids)}
+            tutors = sorted(cursor.fetchall(), key=lambda tutor: rank[tutor[7]])
+            offset = after[0] if after else 0
+            page = tutors[offset:offset + limit]
+            if offset + limit < len(tutors):
+                next_cursor = encode_page_cursor([sort, offset + limit])
+        else:
+            # Keyset pagination: (sort column, id) of the last row on the previous page
+            column, direction = TUTOR_SEARCH_SORTS[sort]
+            if after:
+                op = ">" if direction == "ASC" else "<"
+                conditions.append(f"({column} {op} %s OR ({column} = %s AND id {op} %s))")
+                params.extend([after[0], after[0], after[1]])
+            if conditions:
+                query += " AND " + " AND ".join(conditions)
+            query += f" ORDER BY {column} {direction}, id {direction} LIMIT %s"
+            params.append(limit + 1)
+            cursor.execute(query, params)
+            tutors = cursor.fetchall()
+            page = tutors[:limit]
+            if len(tutors) > limit:
+                last = page[-1]
+                next_cursor = encode_page_cursor([sort, last[TUTOR_SORT_KEYS[sort]], last[7]])
+
+        return FastJSONResponse(
+            [TutorCard(*row[:7]) for row in page],
+            headers={"X-Next-Cursor": next_cursor} if next_cursor else None,
+        )
 
     except Error as e:
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         cursor.close()
-        conn.close()
 
 
 @app.get("/tutors/{public_id}", response_model=Tutor)
-async def get_tutor_details(
+def get_tutor_details(
     public_id: str,
-    current_user: UserInDB = Depends(get_current_active_user)
+    current_user: UserInDB = Depends(get_current_active_user),
+    conn: PooledConnection = Depends(get_db)
 ):
-    conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
 
     try:
@@ -650,17 +1814,16 @@ async def get_tutor_details(
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         cursor.close()
-        conn.close()
 
 @app.post("/conversations/start/{public_id}", response_model=Conversation)
-async def start_conversation(
+def start_conversation(
     public_id: str,
-    current_user: UserInDB = Depends(get_current_active_user)
+    current_user: UserInDB = Depends(get_current_active_user),
+    conn: PooledConnection = Depends(get_db)
 ):
     if current_user.user_type != "student":
         raise HTTPException(status_code=403, detail="Only students can start conversations")
 
-    conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
     
     try:
@@ -685,7 +1848,7 @@ async def start_conversation(
         
         if existing:
             cursor.execute("""
-                SELECT c.*, u.public_id, u.first_name, u.last_name, u.profile_picture_url AS image
+                SELECT c.*, u.public_id, u.first_name, u.last_name, COALESCE(u.profile_thumbnail_url, u.profile_picture_url) AS image
                 FROM conversations c
                 JOIN users u ON c.tutor_id = u.id
                 WHERE c.id = %s
@@ -700,7 +1863,7 @@ async def start_conversation(
         conn.commit()
         
         cursor.execute("""
-            SELECT c.*, u.public_id, u.first_name, u.last_name, u.profile_picture_url AS image
+            SELECT c.*, u.public_id, u.first_name, u.last_name, COALESCE(u.profile_thumbnail_url, u.profile_picture_url) AS image
             FROM conversations c
             JOIN users u ON c.tutor_id = u.id
             WHERE c.id = LAST_INSERT_ID()
@@ -712,127 +1875,193 @@ async def start_conversation(
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         cursor.close()
-        conn.close()
+
+# Inbox rows as ConversationRow; the other participant's user row is joined in
+CONVERSATIONS_QUERY = {
+    "tutor": """
+        SELECT 
+            c.id,
+            c.tutor_id,
+            c.student_id,
+            u.public_id,
+            c.created_at,
+            c.updated_at,
+            NULL AS last_message,
+            COALESCE(s.tutor_unread, 0) AS unread_count,
+            s.last_message_content,
+            s.last_message_time,
+            u.first_name,
+            u.last_name,
+            COALESCE(u.profile_thumbnail_url, u.profile_picture_url) AS image
+        FROM conversations c
+        JOIN users u ON c.student_id = u.id
+        LEFT JOIN conversation_summaries s ON s.conversation_id = c.id
+        WHERE c.tutor_id = %s
+        ORDER BY c.updated_at DESC
+    """,
+    "student": """
+        SELECT 
+            c.id,
+            c.tutor_id,
+            c.student_id,
+            u.public_id,
+            c.created_at,
+            c.updated_at,
+            NULL AS last_message,
+            COALESCE(s.student_unread, 0) AS unread_count,
+            s.last_message_content,
+            s.last_message_time,
+            u.first_name,
+            u.last_name,
+            COALESCE(u.profile_thumbnail_url, u.profile_picture_url) AS image
+        FROM conversations c
+        JOIN users u ON c.tutor_id = u.id
+        LEFT JOIN conversation_summaries s ON s.conversation_id = c.id
+        WHERE c.student_id = %s
+        ORDER BY c.updated_at DESC
+    """,
+}
 
 @app.get("/conversations", response_model=List[Conversation])
-async def get_user_conversations(
-    current_user: UserInDB = Depends(get_current_active_user)
+def get_user_conversations(
+    current_user: UserInDB = Depends(get_current_active_user),
+    conn: PooledConnection = Depends(get_db)
 ):
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
+    cursor = conn.cursor()
 
     try:
-        if current_user.user_type == "tutor":
-            cursor.execute("""
-                SELECT 
-                    c.*, 
-                    u.public_id AS public_id,
-                    u.first_name,
-                    u.last_name,
-                    u.profile_picture_url AS image,
-                    (SELECT COUNT(*) FROM messages m 
-                     WHERE m.conversation_id = c.id AND m.is_read = FALSE 
-                     AND m.sender_id = c.student_id) AS unread_count,
-                    (SELECT m.content FROM messages m 
-                     WHERE m.conversation_id = c.id 
-                     ORDER BY m.sent_at DESC LIMIT 1) AS last_message_content,
-                    (SELECT m.sent_at FROM messages m 
-                     WHERE m.conversation_id = c.id 
-                     ORDER BY m.sent_at DESC LIMIT 1) AS last_message_time
-                FROM conversations c
-                JOIN users u ON c.student_id = u.id
-                WHERE c.tutor_id = %s
-                ORDER BY c.updated_at DESC
-            """, (current_user.id,))
-        else:
-            cursor.execute("""
-                SELECT 
-                    c.*,
-                    u.public_id AS public_id,
-                    u.first_name,
-                    u.last_name,
-                    u.profile_picture_url AS image,
-                    (SELECT COUNT(*) 
-                     FROM messages m 
-                     WHERE m.conversation_id = c.id 
-                     AND m.is_read = FALSE 
-                     AND m.sender_id = c.tutor_id) AS unread_count,
-                    (SELECT m.content 
-                     FROM messages m 
-                     WHERE m.conversation_id = c.id 
-                     ORDER BY m.sent_at DESC 
-                     LIMIT 1) AS last_message_content,
-                    (SELECT m.sent_at 
-                     FROM messages m 
-                     WHERE m.conversation_id = c.id 
-                     ORDER BY m.sent_at DESC 
-                     LIMIT 1) AS last_message_time
-                FROM conversations c
-                JOIN users u ON c.tutor_id = u.id
-                WHERE c.student_id = %s
-                ORDER BY c.updated_at DESC
-            """, (current_user.id,))
-        
-        conversations = cursor.fetchall()
-        return conversations
+        # Inbox is a single indexed read; last message and unread counters are
+        # maintained in conversation_summaries by send_message / mark-as-read.
+        role = "tutor" if current_user.user_type == "tutor" else "student"
+        cursor.execute(CONVERSATIONS_QUERY[role], (current_user.id,))
+        return FastJSONResponse([ConversationRow(*row) for row in cursor.fetchall()])
 
     except Error as e:
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         cursor.close()
-        conn.close()
+
+MESSAGES_PAGE_SIZE = 50
+MESSAGES_MAX_PAGE_SIZE = 200
 
 @app.get("/conversations/{conversation_id}/messages", response_model=list[Message])
-async def get_conversation_messages(
+def get_conversation_messages(
     conversation_id: int,
-    current_user: UserInDB = Depends(get_current_active_user)
+    before_id: Optional[int] = Query(None, description="Return messages older than this message id"),
+    after_id: Optional[int] = Query(None, description="Return messages newer than this message id"),
+    limit: int = Query(MESSAGES_PAGE_SIZE, ge=1, le=MESSAGES_MAX_PAGE_SIZE),
+    current_user: UserInDB = Depends(get_current_active_user),
+    conn: PooledConnection = Depends(get_db)
 ):
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
+    cursor = conn.cursor()
     
     try:
         cursor.execute("""
-            SELECT * FROM conversations 
+            SELECT id FROM conversations 
             WHERE id = %s AND (tutor_id = %s OR student_id = %s)
         """, (conversation_id, current_user.id, current_user.id))
         if not cursor.fetchone():
             raise HTTPException(status_code=404, detail="Conversation not found")
         
-        cursor.execute("""
-            SELECT * FROM messages 
-            WHERE conversation_id = %s
-            ORDER BY sent_at ASC
-        """, (conversation_id,))
-        messages = cursor.fetchall()
-        
-        # Mark messages as read
-        if current_user.user_type == "tutor":
-            sender_condition = "sender_id = (SELECT student_id FROM conversations WHERE id = %s)"
+        # Keyset pages over idx_messages_conversation_id; always returned oldest first.
+        # Without a cursor this is the latest page.
+        if after_id is not None:
+            cursor.execute("""
+                SELECT id, conversation_id, sender_id, content, sent_at, is_read FROM messages 
+                WHERE conversation_id = %s AND id > %s
+                ORDER BY id ASC
+                LIMIT %s
+            """, (conversation_id, after_id, limit))
+            messages = cursor.fetchall()
         else:
-            sender_condition = "sender_id = (SELECT tutor_id FROM conversations WHERE id = %s)"
+            if before_id is not None:
+                cursor.execute("""
+                    SELECT id, conversation_id, sender_id, content, sent_at, is_read FROM messages 
+                    WHERE conversation_id = %s AND id < %s
+                    ORDER BY id DESC
+                    LIMIT %s
+                """, (conversation_id, before_id, limit))
+            else:
+                cursor.execute("""
+                    SELECT id, conversation_id, sender_id, content, sent_at, is_read FROM messages 
+                    WHERE conversation_id = %s
+                    ORDER BY id DESC
+                    LIMIT %s
+                """, (conversation_id, limit))
+            messages = cursor.fetchall()
+            messages.reverse()
         
-        cursor.execute(f"""
-            UPDATE messages 
-            SET is_read = TRUE 
-            WHERE conversation_id = %s AND is_read = FALSE AND {sender_condition}
-        """, (conversation_id, conversation_id))
+        return FastJSONResponse([MessageRow(*row[:5], bool(row[5])) for row in messages])
+        
+    except Error as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        cursor.close()
+
+@app.post("/conversations/{conversation_id}/read")
+def mark_conversation_read(
+    conversation_id: int,
+    up_to_id: Optional[int] = Query(None, description="Mark messages up to and including this id; defaults to all"),
+    current_user: UserInDB = Depends(get_current_active_user),
+    conn: PooledConnection = Depends(get_db)
+):
+    cursor = conn.cursor(dictionary=True)
+    
+    try:
+        cursor.execute("""
+            SELECT tutor_id, student_id FROM conversations 
+            WHERE id = %s AND (tutor_id = %s OR student_id = %s)
+        """, (conversation_id, current_user.id, current_user.id))
+        conv = cursor.fetchone()
+        if not conv:
+            raise HTTPException(status_code=404, detail="Conversation not found")
+        
+        if current_user.id == conv['tutor_id']:
+            other_id, unread_column = conv['student_id'], "tutor_unread"
+        else:
+            other_id, unread_column = conv['tutor_id'], "student_unread"
+        
+        # Only unread rows from the other participant are touched (idx_messages_unread)
+        if up_to_id is None:
+            cursor.execute("""
+                UPDATE messages 
+                SET is_read = TRUE 
+                WHERE conversation_id = %s AND is_read = FALSE AND sender_id = %s
+            """, (conversation_id, other_id))
+        else:
+            cursor.execute("""
+                UPDATE messages 
+                SET is_read = TRUE 
+                WHERE conversation_id = %s AND is_read = FALSE AND sender_id = %s AND id <= %s
+            """, (conversation_id, other_id, up_to_id))
+        marked = cursor.rowcount
+        
+        if marked:
+            cursor.execute(f"""
+                UPDATE conversation_summaries 
+                SET {unread_column} = (
+                    SELECT COUNT(*) FROM messages 
+                    WHERE conversation_id = %s AND is_read = FALSE AND sender_id = %s
+                )
+                WHERE conversation_id = %s
+            """, (conversation_id, other_id, conversation_id))
         conn.commit()
         
-        return messages
+        return {"marked_read": marked}
         
     except Error as e:
+        conn.rollback()
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         cursor.close()
-        conn.close()
 
 @app.post("/conversations/{conversation_id}/messages", response_model=Message)
-async def send_message(
+def send_message(
     conversation_id: int,
     message: MessageCreate,
-    current_user: UserInDB = Depends(get_current_active_user)
+    current_user: UserInDB = Depends(get_current_active_user),
+    conn: PooledConnection = Depends(get_db)
 ):
-    conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
     
     try:
@@ -851,6 +2080,33 @@ async def send_message(
             VALUES (%s, %s, %s)
         """, (conversation_id, current_user.id, message.content))
         
+        cursor.execute("""
+            SELECT * FROM messages 
+            WHERE id = %s
+        """, (cursor.lastrowid,))
+        new_message = cursor.fetchone()
+        
+        # Keep the inbox summary in step with the message, in the same transaction
+        recipient_is_tutor = recipient_id == conv['tutor_id']
+        cursor.execute("""
+            INSERT INTO conversation_summaries 
+            (conversation_id, last_message_id, last_message_content, last_message_time, tutor_unread, student_unread)
+            VALUES (%s, %s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE 
+                last_message_id = VALUES(last_message_id),
+                last_message_content = VALUES(last_message_content),
+                last_message_time = VALUES(last_message_time),
+                tutor_unread = tutor_unread + VALUES(tutor_unread),
+                student_unread = student_unread + VALUES(student_unread)
+        """, (
+            conversation_id,
+            new_message['id'],
+            new_message['content'],
+            new_message['sent_at'],
+            1 if recipient_is_tutor else 0,
+            0 if recipient_is_tutor else 1
+        ))
+        
         cursor.execute("""
             UPDATE conversations 
             SET updated_at = NOW() 
@@ -859,12 +2115,6 @@ async def send_message(
         
         conn.commit()
         
-        cursor.execute("""
-            SELECT * FROM messages 
-            WHERE id = LAST_INSERT_ID()
-        """)
-        new_message = cursor.fetchone()
-        
         message_data = {
             "type": "new_message",
             "conversation_id": conversation_id,
@@ -877,7 +2127,9 @@ async def send_message(
             }
         }
         
-        await manager.send_personal_message(
+        # Handlers run in a worker thread; hop back to the event loop for the socket write
+        anyio.from_thread.run(
+            manager.send_personal_message,
             json.dumps(message_data),
             recipient_id
         )
@@ -889,43 +2141,42 @@ async def send_message(
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         cursor.close()
-        conn.close()
 
 @app.get("/conversations/unread-count")
-async def get_unread_count(
-    current_user: UserInDB = Depends(get_current_active_user)
+def get_unread_count(
+    current_user: UserInDB = Depends(get_current_active_user),
+    conn: PooledConnection = Depends(get_db)
 ):
-    conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
     
     try:
         if current_user.user_type == "tutor":
             cursor.execute("""
-                SELECT COUNT(*) as count
-                FROM messages m
-                JOIN conversations c ON m.conversation_id = c.id
-                WHERE c.tutor_id = %s AND m.sender_id = c.student_id AND m.is_read = FALSE
+                SELECT COALESCE(SUM(s.tutor_unread), 0) as count
+                FROM conversations c
+                JOIN conversation_summaries s ON s.conversation_id = c.id
+                WHERE c.tutor_id = %s
             """, (current_user.id,))
         else:
             cursor.execute("""
-                SELECT COUNT(*) as count
-                FROM messages m
-                JOIN conversations c ON m.conversation_id = c.id
-                WHERE c.student_id = %s AND m.sender_id = c.tutor_id AND m.is_read = FALSE
+                SELECT COALESCE(SUM(s.student_unread), 0) as count
+                FROM conversations c
+                JOIN conversation_summaries s ON s.conversation_id = c.id
+                WHERE c.student_id = %s
             """, (current_user.id,))
         
         result = cursor.fetchone()
-        return {"unread_count": result['count']}
+        return {"unread_count": int(result['count'])}
         
     except Error as e:
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         cursor.close()
-        conn.close()
 @app.post("/save-availability")
-async def save_availability(
+def save_availability(
     availability_data: AvailabilityUpdate,
-    current_user: UserInDB = Depends(get_current_active_user)
+    current_user: UserInDB = Depends(get_current_active_user),
+    conn: PooledConnection = Depends(get_db)
 ):
     if current_user.user_type != "tutor":
         raise HTTPException(
@@ -933,18 +2184,10 @@ async def save_availability(
             detail="Only tutors can set availability"
         )
 
-    conn = get_db_connection()
     cursor = conn.cursor()
 
     try:
-        # Step 1: Fetch existing availability
-        cursor.execute(
-            "SELECT day_of_week, time_slot FROM tutor_availability WHERE tutor_id = %s",
-            (current_user.id,)
-        )
-        existing_slots = set(cursor.fetchall())  # Set of tuples (day, slot)
-
-        # Step 2: Build new slots set
+        # Step 1: Build new slots set
         new_slots = set()
         for day_slots in availability_data.availability:
             for slot in day_slots.slots:
@@ -955,30 +2198,24 @@ async def save_availability(
                     )
                 new_slots.add((day_slots.day, slot))
 
-        # Step 3: Determine which slots to insert and delete
+        # Step 2: Publish the weekly mask; booked bits are owned by bookings.
+        # Written first: bookings lock the mask row before the slot rows too
+        availability.save_offered(cursor, current_user.id, availability.WeeklyBitmap.from_slots(new_slots))
+
+        # Step 3: Fetch existing availability
+        cursor.execute(
+            "SELECT day_of_week, time_slot FROM tutor_availability WHERE tutor_id = %s",
+            (current_user.id,)
+        )
+        existing_slots = set(cursor.fetchall())  # Set of tuples (day, slot)
+
+        # Step 4: Determine which slots to insert and delete
         slots_to_add = new_slots - existing_slots
         slots_to_remove = existing_slots - new_slots
 
-        # Step 4: Perform deletions
-        for day, slot in slots_to_remove:
-            cursor.execute(
-                """
-                DELETE FROM tutor_availability 
-                WHERE tutor_id = %s AND day_of_week = %s AND time_slot = %s
-                """,
-                (current_user.id, day, slot)
-            )
-
-        # Step 5: Perform insertions
-        for day, slot in slots_to_add:
-            cursor.execute(
-                """
-                INSERT INTO tutor_availability 
-                (tutor_id, day_of_week, time_slot, is_available)
-                VALUES (%s, %s, %s, TRUE)
-                """,
-                (current_user.id, day, slot)
-            )
+        # Step 5: Perform deletions and insertions as multi-row statements
+        availability.delete_slot_rows(cursor, current_user.id, slots_to_remove)
+        availability.insert_slot_rows(cursor, current_user.id, slots_to_add)
 
         conn.commit()
         return {"message": "Availability updated successfully"}
@@ -991,13 +2228,12 @@ async def save_availability(
         )
     finally:
         cursor.close()
-        conn.close()
 
 @app.post("/get-availability")
-async def get_availability(
-    tutor: AvailabilityRequest
+def get_availability(
+    tutor: AvailabilityRequest,
+    conn: PooledConnection = Depends(get_db)
 ):
-    conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
 
     try:
@@ -1007,17 +2243,10 @@ async def get_availability(
         )
         result = cursor.fetchone()
         id = result['id']
+        offered, booked = availability.load_masks(cursor, id)
         if tutor.with_booking:
-            cursor.execute(
-                "SELECT day_of_week, time_slot FROM tutor_availability WHERE tutor_id = %s AND is_available = 1 ORDER BY day_of_week, time_slot;",
-                (id,)
-            )
-        else:
-            cursor.execute(
-                "SELECT day_of_week, time_slot FROM tutor_availability WHERE tutor_id = %s ORDER BY day_of_week, time_slot;",
-                (id,)
-            )
-        slots = cursor.fetchall()
+            offered.clear(booked)
+        slots = [{"day_of_week": day, "time_slot": slot} for day, slot in offered.slots()]
         return {"availability": slots}
 
     except Error as e:
@@ -1027,7 +2256,6 @@ async def get_availability(
         )
     finally:
         cursor.close()
-        conn.close()
 
 def get_student_id_from_token(token: str):
     try:
@@ -1037,17 +2265,188 @@ def get_student_id_from_token(token: str):
         raise HTTPException(status_code=401, detail="Invalid token")
 
 
+# Lesson expiry: a min-heap of upcoming lesson end times, fired exactly when lessons end
+EXPIRY_ENABLED = os.getenv("EXPIRY_ENABLED", "1") == "1"  # 0 when DB_checker.py --daemon runs expiry instead
+EXPIRY_BATCH_SIZE = int(os.getenv("EXPIRY_BATCH_SIZE", "500"))  # bookings expired per transaction
+EXPIRY_RESYNC_SECONDS = int(os.getenv("EXPIRY_RESYNC_SECONDS", "300"))  # reload horizon from the DB
+EXPIRY_RETRY_SECONDS = float(os.getenv("EXPIRY_RETRY_SECONDS", "2"))  # re-check of due bookings left active
+
+
+UPCOMING_EXPIRIES_QUERY = "SELECT id, ends_at FROM bookings WHERE active = TRUE AND ends_at <= %s"
+
+
+def load_upcoming_expiries(horizon: datetime) -> list[tuple]:
+    """Active bookings ending before horizon, via idx_bookings_active_ends."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(UPCOMING_EXPIRIES_QUERY, (horizon,))
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def expire_bookings(booking_ids: list[int]) -> tuple[int, set, list[tuple]]:
+    """Returns the number of completed bookings, the users they belonged to and the
+    (id, ends_at) of those left active: the database clock had not reached
+    ends_at yet, or another transaction held the row.
+    """
+    conn = get_db_connection()
+    try:
+        users = set()
+        completed = DB_checker.complete_bookings(conn, booking_ids, users)["completed"]
+        if completed == len(booking_ids):
+            return completed, users, []
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                f"SELECT id, ends_at FROM bookings WHERE id IN ({', '.join(['%s'] * len(booking_ids))}) AND active = TRUE",
+                list(booking_ids)
+            )
+            return completed, users, cursor.fetchall()
+        finally:
+            cursor.close()
+    finally:
+        conn.close()
+
+
+class LessonExpiryScheduler:
+    def __init__(self, batch_size: int, resync_seconds: int, retry_seconds: float):
+        self.batch_size = batch_size
+        self.resync_seconds = resync_seconds
+        self.retry_seconds = retry_seconds
+        self._heap: list[tuple[datetime, int]] = []
+        self._queued: set[int] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.expired = 0
+        self.retried = 0
+        self.last_run_ms = 0.0
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def schedule(self, booking_id: int, ends_at: datetime):
+        """Thread-safe; called by sync handlers after a booking commits."""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._push, booking_id, ends_at)
+
+    def _push(self, booking_id: int, ends_at: datetime):
+        if booking_id in self._queued:
+            return
+        heapq.heappush(self._heap, (ends_at, booking_id))
+        self._queued.add(booking_id)
+        if self._heap[0][1] == booking_id:
+            self._wakeup.set()  # new earliest deadline
+
+    def _pop_due(self, now: datetime) -> list[int]:
+        due = []
+        while self._heap and self._heap[0][0] <= now and len(due) < self.batch_size:
+            _, booking_id = heapq.heappop(self._heap)
+            self._queued.discard(booking_id)
+            due.append(booking_id)
+        return due
+
+    async def _run(self):
+        # The resync covers restarts, bookings made by other workers and failed
+        # batches: anything still active and ending soon is pushed again
+        next_resync = 0.0
+        while True:
+            try:
+                if time.monotonic() >= next_resync:
+                    horizon = datetime.now() + timedelta(seconds=self.resync_seconds)
+                    for booking_id, ends_at in await anyio.to_thread.run_sync(load_upcoming_expiries, horizon):
+                        self._push(booking_id, ends_at)
+                    next_resync = time.monotonic() + self.resync_seconds
+
+                due = self._pop_due(datetime.now())
+                if due:
+                    started = time.perf_counter()
+                    expired, users, remaining = await anyio.to_thread.run_sync(expire_bookings, due)
+                    self.expired += expired
+                    # Left active (database clock behind ours, or the row was locked): try again shortly
+                    retry_at = datetime.now() + timedelta(seconds=self.retry_seconds)
+                    for booking_id, ends_at in remaining:
+                        self._push(booking_id, max(ends_at, retry_at))
+                    self.retried += len(remaining)
+                    self.last_run_ms = (time.perf_counter() - started) * 1000
+                    self.runs += 1
+                    await publish_lessons_changed(users)
+                    continue
+
+                timeout = next_resync - time.monotonic()
+                if self._heap:
+                    timeout = min(timeout, (self._heap[0][0] - datetime.now()).total_seconds())
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=max(timeout, 0))
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("lesson expiry failed, retrying after resync: %s", e)
+                next_resync = 0.0
+                await asyncio.sleep(5)
+
+    def stats(self) -> dict:
+        return {
+            "queued": len(self._heap),
+            "next_ends_at": self._heap[0][0].isoformat() if self._heap else None,
+            "runs": self.runs,
+            "expired": self.expired,
+            "retried": self.retried,
+            "last_run_ms": round(self.last_run_ms, 2),
+        }
+
+
+lesson_expiry = LessonExpiryScheduler(EXPIRY_BATCH_SIZE, EXPIRY_RESYNC_SECONDS, EXPIRY_RETRY_SECONDS)
+
+@app.on_event("startup")
+async def start_lesson_expiry():
+    if EXPIRY_ENABLED:
+        await lesson_expiry.start()
+
+@app.on_event("shutdown")
+async def stop_lesson_expiry():
+    await lesson_expiry.stop()
+
+
+BOOKING_ATTEMPTS = 3  # deadlock / lock wait retries before answering 409
+BOOKING_RETRY_ERRORS = (errorcode.ER_LOCK_DEADLOCK, errorcode.ER_LOCK_WAIT_TIMEOUT)
+
+
 # Endpoint to handle bookings
 @app.post("/book-lesson/{tutor_id}")
-async def book_lesson(
+def book_lesson(
     tutor_id: str,
     request: BookLessonRequest,
-    current_user: UserInDB = Depends(get_current_active_user)
+    current_user: UserInDB = Depends(get_current_active_user),
+    conn: PooledConnection = Depends(get_db)
 ):
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
     if(current_user.user_type != "student"):
         raise HTTPException(status_code=403, detail="Only students can book lessons")
+    if not availability.valid_range(request.day_of_week, request.time_slot, request.duration):
+        raise HTTPException(status_code=400, detail="Invalid time slot")
+    if request.frequency not in ("once", "weekly"):
+        raise HTTPException(status_code=400, detail="Invalid frequency")
+
+    mask = availability.WeeklyBitmap.from_range(request.day_of_week, request.time_slot, request.duration)
+    scheduled_at = get_next_scheduled_datetime(request.day_of_week, request.time_slot)
+    cursor = conn.cursor(dictionary=True)
     try:
         # Get tutor DB ID
         cursor.execute("SELECT id FROM users WHERE public_id = %s", (tutor_id,))
@@ -1055,156 +2454,364 @@ async def book_lesson(
         if not tutor:
             raise HTTPException(status_code=404, detail="Tutor not found")
 
-        # Check if the time slot is available
-        cursor.execute(
-            """
-            SELECT is_available FROM tutor_availability 
-            WHERE tutor_id = %s AND day_of_week = %s AND time_slot = %s
-            """,
-            (tutor["id"], request.day_of_week, request.time_slot)
+        for attempt in range(BOOKING_ATTEMPTS):
+            try:
+                # The booking rows go in first so the contended mask row is
+                # locked as late as possible in the transaction
+                if request.frequency == "weekly":
+                    booking_id = DB_checker.create_series(
+                        cursor, tutor["id"], current_user.id, request.day_of_week,
+                        request.time_slot, request.duration, scheduled_at
+                    )
+                else:
+                    cursor.execute(
+                        """
+                        INSERT INTO bookings 
+                        (tutor_id, student_id, day_of_week, duration, frequency, scheduled_at)
+                        VALUES (%s, %s, %s, %s, %s, %s)
+                        """,
+                        (tutor["id"], current_user.id, request.day_of_week, request.duration, request.frequency, scheduled_at)
+                    )
+                    booking_id = cursor.lastrowid
+                if not availability.claim(cursor, tutor["id"], mask):
+                    raise HTTPException(status_code=400, detail="Time slot not available")
+
+                # Update availability for the full duration
+                availability.mark_slot_rows(
+                    cursor, tutor["id"], request.day_of_week, request.time_slot, request.duration, False
+                )
+                conn.commit()
+                lesson_expiry.schedule(booking_id, scheduled_at + timedelta(minutes=30 * request.duration))
+                anyio.from_thread.run(publish_lessons_changed, [tutor["id"], current_user.id])
+                return {"message": "Booked successfully!"}
+            except Error as e:
+                conn.rollback()
+                if e.errno not in BOOKING_RETRY_ERRORS:
+                    raise
+        raise HTTPException(status_code=409, detail="Time slot is being booked, please retry")
+
+    except HTTPException:
+        conn.rollback()
+        raise
+    except Exception as e:
+        conn.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        cursor.close()
+
+# Lesson queries. Time windows filter on the stored ends_at column so that the
+# (user, active, ...) indexes are used; explain_check.py fails if any of them
+# falls back to a full scan of bookings.
+LESSON_LINK_QUERY = """
+    SELECT id AS booking_id, scheduled_at
+    FROM bookings
+    WHERE {filter_key} = %s
+    AND active = TRUE
+    AND ends_at > NOW()
+    AND scheduled_at < NOW() + INTERVAL 5 MINUTE
+    ORDER BY scheduled_at ASC
+    LIMIT 1
+"""  # format with filter_key = tutor_id / student_id
+LESSONS_QUERY = {
+    "tutor": """
+    SELECT 
+        b.id,
+        b.day_of_week,
+        b.duration,
+        b.frequency,
+        b.scheduled_at,
+        b.ends_at,
+        u.first_name AS student_first_name,
+        u.last_name AS student_last_name,
+        u.profile_picture_url AS student_profile_picture,
+        u.public_id AS student_public_id
+    FROM 
+        bookings b
+    JOIN 
+        users u ON b.student_id = u.id
+    WHERE 
+        b.tutor_id = %s AND b.active = TRUE
+        AND NOT EXISTS (
+            SELECT 1 FROM bookings p
+            WHERE p.series_id = b.series_id AND p.active = TRUE AND p.scheduled_at < b.scheduled_at
         )
-        availability = cursor.fetchone()
-        
-        if not availability or not availability['is_available']:
-            raise HTTPException(status_code=400, detail="Time slot not available")
+    ORDER BY 
+        b.scheduled_at DESC
+    """,
+    "student": """
+    SELECT 
+        b.id,
+        b.day_of_week,
+        b.duration,
+        b.frequency,
+        b.scheduled_at,
+        b.ends_at,
+        u.first_name AS tutor_first_name,
+        u.last_name AS tutor_last_name,
+        u.profile_picture_url AS tutor_profile_picture,
+        u.subject AS tutor_subject,
+        u.public_id AS tutor_public_id,
+        u.hourly_rate AS tutor_hourly_rate
+    FROM 
+        bookings b
+    JOIN 
+        users u ON b.tutor_id = u.id
+    WHERE 
+        b.student_id = %s AND b.active = TRUE
+        AND NOT EXISTS (
+            SELECT 1 FROM bookings p
+            WHERE p.series_id = b.series_id AND p.active = TRUE AND p.scheduled_at < b.scheduled_at
+        )
+    ORDER BY 
+        b.scheduled_at DESC
+    """,
+}
 
+TOTAL_LESSONS_QUERY = {
+    "tutor": "SELECT COUNT(*) AS total_lessons FROM bookings WHERE tutor_id = %s AND status = 'completed'",
+    "student": "SELECT COUNT(*) AS total_lessons FROM bookings WHERE student_id = %s AND status = 'completed'",
+}
 
-        # Update availability for the full duration
-        cursor.execute(
-            """
-            UPDATE tutor_availability 
-            SET is_available = FALSE 
-            WHERE tutor_id = %s AND day_of_week = %s AND time_slot >= %s AND time_slot < %s
-            """,
-            (
-                tutor["id"],
-                request.day_of_week,
-                request.time_slot,
-                request.time_slot + request.duration
-            )
-        )
+# Per-user lesson snapshots: the rows behind /lessons, /students/next-lesson and
+# /total-lessons. Anything time-dependent (status, time_left, which lesson is next)
+# is derived per request, so a snapshot only changes when bookings do.
+LESSON_CACHE_SIZE = int(os.getenv("LESSON_CACHE_SIZE", "2048"))  # users kept per worker
+LESSON_CACHE_TTL = int(os.getenv("LESSON_CACHE_TTL", "300"))  # safety net; changes are pushed via pub/sub
+LESSONS_CHANNEL = DB_checker.LESSONS_CHANNEL  # also published by DB_checker.py --daemon
+LESSONS_UPDATED_MESSAGE = json.dumps({"type": "lessons_updated"})
 
-        scheduled_at = get_next_scheduled_datetime(request.day_of_week, request.time_slot)
-        cursor.execute(
-            """
-            INSERT INTO bookings 
-            (tutor_id, student_id, day_of_week, duration, frequency, scheduled_at)
-            VALUES (%s, %s, %s, %s, %s, %s)
-            """,
-            (tutor["id"], current_user.id, request.day_of_week, request.duration, request.frequency, scheduled_at)
-        )
 
-        
+class LessonSnapshotCache(LRUCache):
+    """Lesson snapshots keyed by user id."""
 
-        conn.commit()
-        return {"message": "Booked successfully!"}
+    def __init__(self, max_size: int, ttl: float):
+        super().__init__(max_size, ttl)
+        self._epoch = 0  # bumped by every invalidation
 
-    except Exception as e:
-        conn.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
+    def epoch(self) -> int:
+        with self._lock:
+            return self._epoch
+
+    def put(self, user_id: int, snapshot: dict, epoch: int):
+        """Stores a snapshot loaded after epoch() returned epoch, unless an invalidation raced the load."""
+        with self._lock:
+            if epoch == self._epoch:
+                super().put(user_id, snapshot)
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._epoch += 1
+            super().invalidate(user_id)
+
+
+lesson_cache = LessonSnapshotCache(LESSON_CACHE_SIZE, LESSON_CACHE_TTL)
+
+def get_lesson_snapshot(conn: PooledConnection, user: UserInDB) -> dict:
+    snapshot = lesson_cache.get(user.id)
+    if snapshot is not None:
+        return snapshot
+    epoch = lesson_cache.epoch()
+    role = "tutor" if user.user_type == "tutor" else "student"
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(LESSONS_QUERY[role], (user.id,))
+        lessons = cursor.fetchall()
+        cursor.execute(TOTAL_LESSONS_QUERY[role], (user.id,))
+        total_lessons = cursor.fetchone()["total_lessons"]
     finally:
         cursor.close()
-        conn.close()
+    # Content hash, so every worker produces the same ETag for the same data
+    digest = hashlib.sha1(json.dumps([lessons, total_lessons], default=str).encode()).hexdigest()
+    # The time-independent part of each /lessons item is built once per snapshot
+    views = []
+    for lesson in lessons:
+        view = {key: value for key, value in lesson.items() if key != "ends_at"}
+        view["duration"] = lesson["duration"] * 30  # Convert to minutes
+        views.append(view)
+    snapshot = {"lessons": lessons, "views": views, "total_lessons": total_lessons, "etag": f'"{digest}"'}
+    lesson_cache.put(user.id, snapshot, epoch)
+    return snapshot
+
+def lesson_status(lesson: dict, now: datetime) -> tuple[str, Optional[float]]:
+    """(status, seconds until start for upcoming lessons) of a LESSONS_QUERY row."""
+    if now < lesson["scheduled_at"]:
+        return "upcoming", (lesson["scheduled_at"] - now).total_seconds()
+    if now <= lesson["ends_at"]:
+        return "ongoing", None
+    return "completed", None
+
+def lesson_response(lesson: dict, now: datetime) -> dict:
+    """A LESSONS_QUERY row as returned by /lessons."""
+    status, time_left = lesson_status(lesson, now)
+    result = {key: value for key, value in lesson.items() if key != "ends_at"}
+    result["duration"] = lesson["duration"] * 30  # Convert to minutes
+    result["status"] = status
+    result["time_left"] = time_left
+    return result
+
+async def publish_lessons_changed(user_ids):
+    """Every worker drops its snapshots and notifies its own sockets (see dispatch_pubsub_message)."""
+    for user_id in set(user_ids):
+        await pubsub.publish(LESSONS_CHANNEL, str(user_id))
+
 
 @app.get("/students/next-lesson")
-async def get_next_lesson(current_user: UserInDB = Depends(get_current_active_user)):
-    conn = None
+def get_next_lesson(
+    current_user: UserInDB = Depends(get_current_active_user),
+    conn: PooledConnection = Depends(get_db)
+):
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
-        if current_user.user_type == 'tutor':
-            # For tutors, search by tutor_id and get student info
-            # Inside the tutor block
-            cursor.execute("""
-                SELECT 
-                    b.day_of_week,
-                    b.duration,
-                    b.frequency,
-                    b.scheduled_at,
-                    u.first_name AS student_first_name,
-                    u.last_name AS student_last_name,
-                    u.profile_picture_url AS student_profile_picture,
-                    u.public_id AS student_public_id
-                FROM 
-                    bookings b
-                JOIN 
-                    users u ON b.student_id = u.id
-                WHERE 
-                    b.tutor_id = %s
-                    AND b.active = TRUE
-                    AND NOW() < DATE_ADD(b.scheduled_at, INTERVAL b.duration * 30 MINUTE)
-                ORDER BY 
-                    b.scheduled_at ASC
-                LIMIT 1;
-            """, (current_user.id,))
-
-        else:
-            # For students, search by student_id and get tutor info
-            cursor.execute("""
-                SELECT 
-                    b.day_of_week,
-                    b.duration,
-                    b.frequency,
-                    b.scheduled_at,
-                    u.first_name AS tutor_first_name,
-                    u.last_name AS tutor_last_name,
-                    u.profile_picture_url AS tutor_profile_picture,
-                    u.subject AS tutor_subject,
-                    u.public_id AS tutor_public_id,
-                    u.hourly_rate AS tutor_hourly_rate
-                FROM 
-                    bookings b
-                JOIN 
-                    users u ON b.tutor_id = u.id
-                WHERE 
-                    b.student_id = %s
-                    AND b.active = TRUE
-                    AND NOW() < DATE_ADD(b.scheduled_at, INTERVAL b.duration * 30 MINUTE)
-                ORDER BY 
-                    b.scheduled_at ASC
-                LIMIT 1;
-            """, (current_user.id,))
+        snapshot = get_lesson_snapshot(conn, current_user)
+    except Error as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        lesson = cursor.fetchone()
-        if not lesson:
-            return {"message": "No upcoming lessons found"}
-        
-        if current_user.user_type == 'tutor':
-            return {
-                "student_first_name": lesson["student_first_name"],
-                "student_last_name": lesson["student_last_name"],
-                "student_profile_picture": lesson["student_profile_picture"],
-                "student_public_id": lesson["student_public_id"],
-                "day_of_week": lesson["day_of_week"],
-                "duration": lesson["duration"]*30, # Convert to minutes
-                "frequency": lesson["frequency"],
-                "scheduled_at": lesson["scheduled_at"],
-                "time_left": (lesson["scheduled_at"] - datetime.now()).total_seconds()
-            }
-        else:
-            return {
-                "tutor_first_name": lesson["tutor_first_name"],
-                "tutor_last_name": lesson["tutor_last_name"],
-                "tutor_profile_picture": lesson["tutor_profile_picture"],
-                "tutor_subject": lesson["tutor_subject"],
-                "tutor_public_id": lesson["tutor_public_id"],
-                "tutor_hourly_rate": lesson["tutor_hourly_rate"],
-                "day_of_week": lesson["day_of_week"],
-                "duration": lesson["duration"]*30, # Convert to minutes
-                "frequency": lesson["frequency"],
-                "scheduled_at": lesson["scheduled_at"],
-                "time_left": (lesson["scheduled_at"] - datetime.now()).total_seconds()
+    now = datetime.now()
+    upcoming = [lesson for lesson in snapshot["lessons"] if lesson["ends_at"] > now]
+    if not upcoming:
+        return {"message": "No upcoming lessons found"}
+
+    result = lesson_response(min(upcoming, key=lambda lesson: lesson["scheduled_at"]), now)
+    del result["id"], result["status"]
+    result["time_left"] = (result["scheduled_at"] - now).total_seconds()
+    return result
+
+# Jitsi rooms are created once per booking (ahead of time by a background task);
+# participant tokens are signed once per (booking, user) and reused until close to expiry.
+JITSI_TOKEN_TTL = timedelta(hours=10)
+JITSI_TOKEN_MIN_REMAINING = timedelta(minutes=int(os.getenv("JITSI_TOKEN_MIN_REMAINING_MINUTES", "30")))
+JITSI_TOKEN_CACHE_SIZE = int(os.getenv("JITSI_TOKEN_CACHE_SIZE", "4096"))  # per worker
+JITSI_PROVISION_AHEAD_MINUTES = int(os.getenv("JITSI_PROVISION_AHEAD_MINUTES", "30"))  # 0 disables pre-provisioning
+JITSI_PROVISION_INTERVAL = int(os.getenv("JITSI_PROVISION_INTERVAL", "60"))  # seconds
+# Lessons starting soon without a room; ends_at is bounded by the longest lesson (one day)
+# so the (active, ends_at) index limits the scan
+UNPROVISIONED_LESSONS_QUERY = """
+    SELECT b.id
+    FROM bookings b
+    LEFT JOIN jitsi_rooms r ON r.booking_id = b.id
+    WHERE b.active = TRUE
+      AND b.ends_at > NOW()
+      AND b.ends_at <= NOW() + INTERVAL %s MINUTE + INTERVAL 1 DAY
+      AND b.scheduled_at <= NOW() + INTERVAL %s MINUTE
+      AND r.id IS NULL
+"""
+
+
+def sign_jitsi_token(user: UserInDB, room: str, expire: datetime) -> str:
+    now = datetime.utcnow()
+    payload = {
+        "typ": "JWT",
+        "alg": "HS256",
+        "aud": JWT_APP_ID,
+        "iss": JWT_APP_ID,
+        "sub": str(user.public_id),
+        "room": room,
+        "iat": int(now.timestamp()),
+        "nbf": int(now.timestamp()),
+        "exp": int(expire.timestamp()),
+        "context": {
+            "user": {
+                "name": user.first_name or "Participant",
+                "id": str(user.public_id)
             }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        }
+    }
+    return jwt.encode(payload, JWT_APP_SECRET, algorithm=JWT_ALGORITHM)
+
+
+class JitsiTokenCache:
+    """Signed lesson tokens keyed by (booking_id, user_id), plus room names by booking."""
+
+    def __init__(self, max_size: int, min_remaining: timedelta):
+        self.min_remaining = min_remaining
+        self._tokens = LRUCache(max_size)
+        self._rooms = LRUCache(max_size)
+
+    def get_token(self, booking_id: int, user_id: int) -> Optional[str]:
+        """A cached token that stays valid for at least min_remaining."""
+        return self._tokens.get((booking_id, user_id))
+
+    def put_token(self, booking_id: int, user_id: int, token: str, expire: datetime):
+        ttl = (expire - datetime.utcnow() - self.min_remaining).total_seconds()
+        self._tokens.put((booking_id, user_id), token, ttl)
+
+    def get_room(self, booking_id: int) -> Optional[str]:
+        return self._rooms.get(booking_id)
+
+    def put_room(self, booking_id: int, room: str):
+        self._rooms.put(booking_id, room)
+
+    def stats(self) -> dict:
+        return {
+            "tokens": len(self._tokens),
+            "rooms": len(self._rooms),
+            "hits": self._tokens.hits,
+            "misses": self._tokens.misses,
+        }
+
+
+jitsi_tokens = JitsiTokenCache(JITSI_TOKEN_CACHE_SIZE, JITSI_TOKEN_MIN_REMAINING)
+
+def get_jitsi_room(conn: PooledConnection, booking_id: int) -> str:
+    """Room name for a booking; jitsi_rooms is written only when the room does not exist yet."""
+    room_name = jitsi_tokens.get_room(booking_id)
+    if room_name:
+        return room_name
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute("SELECT room_name FROM jitsi_rooms WHERE booking_id = %s", (booking_id,))
+        row = cursor.fetchone()
+        if not row:
+            # A concurrent join or the provisioner may win the race; INSERT IGNORE keeps
+            # their room and the re-read below picks it up
+            cursor.execute(
+                "INSERT IGNORE INTO jitsi_rooms (booking_id, room_name) VALUES (%s, %s)",
+                (booking_id, f"room_{secrets.token_hex(8)}")
+            )
+            conn.commit()
+            cursor.execute("SELECT room_name FROM jitsi_rooms WHERE booking_id = %s", (booking_id,))
+            row = cursor.fetchone()
     finally:
-        if conn:
-            conn.close()
-            
-@app.get("/get-lesson-link")
-async def get_lesson_link(current_user: UserInDB = Depends(get_current_active_user)):
+        cursor.close()
+    jitsi_tokens.put_room(booking_id, row["room_name"])
+    return row["room_name"]
+
+def provision_jitsi_rooms() -> int:
+    """Creates rooms for lessons starting within JITSI_PROVISION_AHEAD_MINUTES in one INSERT."""
     conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(UNPROVISIONED_LESSONS_QUERY, (JITSI_PROVISION_AHEAD_MINUTES, JITSI_PROVISION_AHEAD_MINUTES))
+        booking_ids = [row[0] for row in cursor.fetchall()]
+        if booking_ids:
+            cursor.execute(
+                "INSERT IGNORE INTO jitsi_rooms (booking_id, room_name) VALUES "
+                + ", ".join(["(%s, %s)"] * len(booking_ids)),
+                [value for booking_id in booking_ids for value in (booking_id, f"room_{secrets.token_hex(8)}")]
+            )
+        conn.commit()
+        return len(booking_ids)
+    finally:
+        cursor.close()
+        conn.close()
+
+async def jitsi_provision_loop():
+    while True:
+        try:
+            await anyio.to_thread.run_sync(provision_jitsi_rooms)
+        except Exception as e:
+            logger.warning("jitsi room provisioning failed: %s", e)
+        await asyncio.sleep(JITSI_PROVISION_INTERVAL)
+
+@app.on_event("startup")
+async def start_jitsi_provisioning():
+    if JITSI_PROVISION_AHEAD_MINUTES > 0:
+        spawn_background(jitsi_provision_loop())
+
+@app.get("/get-lesson-link")
+def get_lesson_link(
+    current_user: UserInDB = Depends(get_current_active_user),
+    conn: PooledConnection = Depends(get_db)
+):
     cursor = conn.cursor(dictionary=True)
 
     try:
@@ -1212,16 +2819,7 @@ async def get_lesson_link(current_user: UserInDB = Depends(get_current_active_us
         filter_key = "student_id" if current_user.user_type == "student" else "tutor_id"
 
         # Fetch the upcoming lesson (within the valid time window)
-        cursor.execute(f"""
-            SELECT id AS booking_id, scheduled_at
-            FROM bookings
-            WHERE {filter_key} = %s
-            AND active = TRUE
-            AND NOW() > DATE_SUB(scheduled_at, INTERVAL 5 MINUTE)
-            AND NOW() < DATE_ADD(scheduled_at, INTERVAL duration * 30 MINUTE)
-            ORDER BY scheduled_at ASC
-            LIMIT 1;
-        """, (current_user.id,))
+        cursor.execute(LESSON_LINK_QUERY.format(filter_key=filter_key), (current_user.id,))
 
         lesson = cursor.fetchone()
 
@@ -1229,177 +2827,92 @@ async def get_lesson_link(current_user: UserInDB = Depends(get_current_active_us
             raise HTTPException(status_code=404, detail="No upcoming lessons found")
 
         booking_id = lesson["booking_id"]
+        room_name = get_jitsi_room(conn, booking_id)
 
-        # Check if room already exists for this booking
-        cursor.execute("SELECT room_name FROM jitsi_rooms WHERE booking_id = %s", (booking_id,))
-        existing_room = cursor.fetchone()
-
-        # Use existing room or create a new random one
-        room_name = existing_room["room_name"] if existing_room else f"room_{secrets.token_hex(8)}"
-
-        now = datetime.utcnow()
-        expire = now + timedelta(hours=10)
-
-        payload = {
-            "typ": "JWT",
-            "alg": "HS256",
-            "aud": JWT_APP_ID,
-            "iss": JWT_APP_ID,
-            "sub": str(current_user.public_id),
-            "room": room_name,
-            "iat": int(now.timestamp()),
-            "nbf": int(now.timestamp()),
-            "exp": int(expire.timestamp()),
-            "context": {
-                "user": {
-                    "name": current_user.first_name or "Participant",
-                    "id": str(current_user.public_id)
-                }
-            }
-        }
-
-        token = jwt.encode(payload, JWT_APP_SECRET, algorithm="HS256")
-        lesson_url = f"{JITSI_DOMAIN}/{room_name}?jwt={token}"
-
-        # Insert or update the jitsi room with new JWT
-        cursor.execute("""
-            INSERT INTO jitsi_rooms (booking_id, room_name, jwt_token, created_at)
-            VALUES (%s, %s, %s, NOW())
-            ON DUPLICATE KEY UPDATE jwt_token = VALUES(jwt_token);
-        """, (booking_id, room_name, token))
-        conn.commit()
+        # Reuse this participant's token while it has enough validity left
+        token = jitsi_tokens.get_token(booking_id, current_user.id)
+        if token is None:
+            expire = datetime.utcnow() + JITSI_TOKEN_TTL
+            token = sign_jitsi_token(current_user, room_name, expire)
+            jitsi_tokens.put_token(booking_id, current_user.id, token, expire)
 
-        return {"lesson_link": lesson_url}
+        return {"lesson_link": f"{JITSI_DOMAIN}/{room_name}?jwt={token}"}
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         cursor.close()
-        conn.close()
 
 @app.get("/lessons", response_model=List[dict])
-async def get_lessons(current_user: UserInDB = Depends(get_current_active_user)):
-    conn = None
+def get_lessons(
+    current_user: UserInDB = Depends(get_current_active_user),
+    conn: PooledConnection = Depends(get_db)
+):
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
-        if current_user.user_type == 'tutor':
-            # For tutors, get all active lessons with student info
-            cursor.execute("""
-                SELECT 
-                    b.id,
-                    b.day_of_week,
-                    b.duration,
-                    b.frequency,
-                    b.scheduled_at,
-                    u.first_name AS student_first_name,
-                    u.last_name AS student_last_name,
-                    u.profile_picture_url AS student_profile_picture,
-                    u.public_id AS student_public_id,
-                    CASE 
-                        WHEN NOW() < b.scheduled_at THEN 'upcoming'
-                        WHEN NOW() BETWEEN b.scheduled_at AND DATE_ADD(b.scheduled_at, INTERVAL b.duration * 30 MINUTE) THEN 'ongoing'
-                        ELSE 'completed'
-                    END AS status
-                FROM 
-                    bookings b
-                JOIN 
-                    users u ON b.student_id = u.id
-                WHERE 
-                    b.tutor_id = %s AND b.active = TRUE
-                ORDER BY 
-                    b.scheduled_at DESC;
-            """, (current_user.id,))
-        else:
-            # For students, get all active lessons with tutor info
-            cursor.execute("""
-                SELECT 
-                    b.id,
-                    b.day_of_week,
-                    b.duration,
-                    b.frequency,
-                    b.scheduled_at,
-                    u.first_name AS tutor_first_name,
-                    u.last_name AS tutor_last_name,
-                    u.profile_picture_url AS tutor_profile_picture,
-                    u.subject AS tutor_subject,
-                    u.public_id AS tutor_public_id,
-                    u.hourly_rate AS tutor_hourly_rate,
-                    CASE 
-                        WHEN NOW() < b.scheduled_at THEN 'upcoming'
-                        WHEN NOW() BETWEEN b.scheduled_at AND DATE_ADD(b.scheduled_at, INTERVAL b.duration * 30 MINUTE) THEN 'ongoing'
-                        ELSE 'completed'
-                    END AS status
-                FROM 
-                    bookings b
-                JOIN 
-                    users u ON b.tutor_id = u.id
-                WHERE 
-                    b.student_id = %s AND b.active = TRUE
-                ORDER BY 
-                    b.scheduled_at DESC;
-            """, (current_user.id,))
+        snapshot = get_lesson_snapshot(conn, current_user)
+    except Error as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    now = datetime.now()
+    lessons = []
+    for lesson, view in zip(snapshot["lessons"], snapshot["views"]):
+        status, time_left = lesson_status(lesson, now)
+        lessons.append({**view, "status": status, "time_left": time_left})
+    return FastJSONResponse(lessons)
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match semantics: '*' or any listed tag, compared weakly (W/ ignored)."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag.removeprefix("W/"):
+            return True
+    return False
+
+@app.get("/lessons/snapshot")
+def get_lessons_snapshot(
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    current_user: UserInDB = Depends(get_current_active_user),
+    conn: PooledConnection = Depends(get_db)
+):
+    """Active lessons and completed count in one payload, revalidated with If-None-Match.
 
-        lessons = cursor.fetchall()
-        if not lessons:
-            return []
-        
-        result = []
-        for lesson in lessons:
-            if current_user.user_type == 'tutor':
-                result.append({
-                    "id": lesson["id"],
-                    "student_first_name": lesson["student_first_name"],
-                    "student_last_name": lesson["student_last_name"],
-                    "student_profile_picture": lesson["student_profile_picture"],
-                    "student_public_id": lesson["student_public_id"],
-                    "day_of_week": lesson["day_of_week"],
-                    "duration": lesson["duration"] * 30,  # Convert to minutes
-                    "frequency": lesson["frequency"],
-                    "scheduled_at": lesson["scheduled_at"],
-                    "status": lesson["status"],
-                    "time_left": (lesson["scheduled_at"] - datetime.now()).total_seconds() if lesson["status"] == "upcoming" else None
-                })
-            else:
-                result.append({
-                    "id": lesson["id"],
-                    "tutor_first_name": lesson["tutor_first_name"],
-                    "tutor_last_name": lesson["tutor_last_name"],
-                    "tutor_profile_picture": lesson["tutor_profile_picture"],
-                    "tutor_subject": lesson["tutor_subject"],
-                    "tutor_public_id": lesson["tutor_public_id"],
-                    "tutor_hourly_rate": lesson["tutor_hourly_rate"],
-                    "day_of_week": lesson["day_of_week"],
-                    "duration": lesson["duration"] * 30,  # Convert to minutes
-                    "frequency": lesson["frequency"],
-                    "scheduled_at": lesson["scheduled_at"],
-                    "status": lesson["status"],
-                    "time_left": (lesson["scheduled_at"] - datetime.now()).total_seconds() if lesson["status"] == "upcoming" else None
-                })
-        
-        return result
-        
-    except Exception as e:
+    Clients refetch when the WebSocket announces {"type": "lessons_updated"}.
+    """
+    try:
+        snapshot = get_lesson_snapshot(conn, current_user)
+    except Error as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if conn:
-            conn.close()
-            
+    if etag_matches(if_none_match, snapshot["etag"]):
+        return Response(status_code=304, headers={"ETag": snapshot["etag"]})
+    response.headers["ETag"] = snapshot["etag"]
+    return {
+        "lessons": [
+            {**lesson, "duration": lesson["duration"] * 30}  # Convert to minutes
+            for lesson in snapshot["lessons"]
+        ],
+        "total_lessons": snapshot["total_lessons"],
+    }
+
 @app.delete("/delete-lesson/{lesson_id}")
-async def delete_lesson(
+def delete_lesson(
     lesson_id: int,
-    current_user: UserInDB = Depends(get_current_active_user)
+    current_user: UserInDB = Depends(get_current_active_user),
+    conn: PooledConnection = Depends(get_db)
 ):
-    conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
 
     try:
-        # Fetch necessary booking details
+        # Fetch necessary booking details; the row lock keeps the expiry runner
+        # (SKIP LOCKED) and a concurrent delete away until we commit
         cursor.execute("""
-            SELECT tutor_id, student_id, scheduled_at, duration
+            SELECT tutor_id, student_id, series_id, scheduled_at, duration
             FROM bookings 
             WHERE id = %s AND active = TRUE
+            FOR UPDATE
         """, (lesson_id,))
         lesson = cursor.fetchone()
 
@@ -1419,66 +2932,283 @@ async def delete_lesson(
 
         # Calculate time slot index
         start_slot = hour * 2 + (minute // 30)
-        end_slot = start_slot + duration
 
-        # Cancel the booking
-        cursor.execute("UPDATE bookings SET active = FALSE, status = 'cancelled' WHERE id = %s", (lesson_id,))
+        # Cancel the booking; for a weekly lesson that is the whole series
+        if lesson["series_id"]:
+            cursor.execute(
+                "UPDATE lesson_series SET active = FALSE WHERE id = %s AND active = TRUE",
+                (lesson["series_id"],)
+            )
+            cancelled = cursor.rowcount == 1
+            cursor.execute(
+                "UPDATE bookings SET active = FALSE, status = 'cancelled' WHERE series_id = %s AND active = TRUE",
+                (lesson["series_id"],)
+            )
+        else:
+            cursor.execute(
+                "UPDATE bookings SET active = FALSE, status = 'cancelled' WHERE id = %s AND active = TRUE",
+                (lesson_id,)
+            )
+            cancelled = cursor.rowcount == 1
+        if not cancelled:
+            # Already cancelled or completed by someone else; its slots were released then
+            raise HTTPException(status_code=404, detail="Lesson not found")
 
         # Free up all affected time slots
-        for time_slot in range(start_slot, end_slot):
-            cursor.execute("""
-                UPDATE tutor_availability 
-                SET is_available = TRUE 
-                WHERE tutor_id = %s AND day_of_week = %s AND time_slot = %s
-            """, (lesson["tutor_id"], day_of_week, time_slot))
+        availability.release(
+            cursor, lesson["tutor_id"], availability.WeeklyBitmap.from_range(day_of_week, start_slot, duration)
+        )
+        availability.mark_slot_rows(cursor, lesson["tutor_id"], day_of_week, start_slot, duration, True)
 
         conn.commit()
+        anyio.from_thread.run(publish_lessons_changed, [lesson["tutor_id"], lesson["student_id"]])
         return {"message": "Lesson deleted successfully"}
 
+    except HTTPException:
+        conn.rollback()
+        raise
     except Exception as e:
         conn.rollback()
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         cursor.close()
-        conn.close()
 
 @app.get("/total-lessons")
-async def get_total_lessons(
-    current_user: UserInDB = Depends(get_current_active_user)
+def get_total_lessons(
+    current_user: UserInDB = Depends(get_current_active_user),
+    conn: PooledConnection = Depends(get_db)
 ):
+    try:
+        return {"total_lessons": get_lesson_snapshot(conn, current_user)["total_lessons"]}
+    except Error as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Outbound email: handlers only insert into email_outbox; background workers
+# send with retries, exponential backoff and a per-recipient rate limit
+EMAIL_WORKERS = int(os.getenv("EMAIL_WORKERS", "2"))  # concurrent senders per API worker
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", "6"))  # then the row is marked failed
+EMAIL_BACKOFF_BASE = float(os.getenv("EMAIL_BACKOFF_BASE", "30"))  # seconds before the first retry, doubled each time
+EMAIL_RECIPIENT_INTERVAL = int(os.getenv("EMAIL_RECIPIENT_INTERVAL", "60"))  # min seconds between emails to one address
+EMAIL_POLL_INTERVAL = float(os.getenv("EMAIL_POLL_INTERVAL", "5"))  # idle workers re-check the table this often
+EMAIL_LEASE_SECONDS = 120  # a claimed row becomes due again if its sender dies mid-send
+
+
+def queue_email(cursor, recipient: str, template: str, params: dict):
+    """Adds an email to the outbox in the caller's transaction.
+
+    A still-pending email with the same template is updated instead, so
+    repeated requests do not pile up duplicates.
+    """
+    cursor.execute("""
+        UPDATE email_outbox SET params = %s
+        WHERE recipient = %s AND template = %s AND status = 'pending'
+    """, (json.dumps(params), recipient, template))
+    if cursor.rowcount == 0:
+        cursor.execute(
+            "INSERT INTO email_outbox (recipient, template, params) VALUES (%s, %s, %s)",
+            (recipient, template, json.dumps(params))
+        )
+
+def claim_email() -> Optional[dict]:
+    """Leases the next due email, deferring ones whose recipient was emailed too recently."""
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
-
     try:
-        if current_user.user_type == "tutor":
+        while True:
             cursor.execute("""
-                SELECT COUNT(*) as total_lessons
-                FROM bookings
-                WHERE tutor_id = %s AND status = 'completed'
-            """, (current_user.id,))
-        else:
+                SELECT id, recipient, template, params, attempts
+                FROM email_outbox
+                WHERE status = 'pending' AND next_attempt_at <= NOW()
+                ORDER BY next_attempt_at
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            """)
+            job = cursor.fetchone()
+            if job is None:
+                conn.commit()
+                return None
             cursor.execute("""
-                SELECT COUNT(*) as total_lessons
-                FROM bookings
-                WHERE student_id = %s AND status = 'completed'
-            """, (current_user.id,))
+                SELECT 1 FROM email_outbox
+                WHERE recipient = %s AND status = 'sent' AND sent_at > NOW() - INTERVAL %s SECOND
+                LIMIT 1
+            """, (job["recipient"], EMAIL_RECIPIENT_INTERVAL))
+            if cursor.fetchone():
+                cursor.execute(
+                    "UPDATE email_outbox SET next_attempt_at = NOW() + INTERVAL %s SECOND WHERE id = %s",
+                    (EMAIL_RECIPIENT_INTERVAL, job["id"])
+                )
+                conn.commit()
+                continue
+            cursor.execute("""
+                UPDATE email_outbox
+                SET attempts = attempts + 1, next_attempt_at = NOW() + INTERVAL %s SECOND
+                WHERE id = %s
+            """, (EMAIL_LEASE_SECONDS, job["id"]))
+            conn.commit()
+            job["attempts"] += 1
+            job["params"] = json.loads(job["params"])
+            return job
+    finally:
+        cursor.close()
+        conn.close()
 
-        result = cursor.fetchone()
-        return {"total_lessons": result['total_lessons']}
+def finish_email(job: dict, error: Optional[str]):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        if error is None:
+            cursor.execute(
+                "UPDATE email_outbox SET status = 'sent', sent_at = NOW(), last_error = NULL WHERE id = %s",
+                (job["id"],)
+            )
+        elif job["attempts"] >= EMAIL_MAX_ATTEMPTS:
+            cursor.execute(
+                "UPDATE email_outbox SET status = 'failed', last_error = %s WHERE id = %s",
+                (error, job["id"])
+            )
+        else:
+            backoff = EMAIL_BACKOFF_BASE * 2 ** (job["attempts"] - 1)
+            cursor.execute(
+                "UPDATE email_outbox SET next_attempt_at = NOW() + INTERVAL %s SECOND, last_error = %s WHERE id = %s",
+                (int(backoff), error, job["id"])
+            )
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+def count_pending_emails() -> int:
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT COUNT(*) FROM email_outbox WHERE status = 'pending'")
+        return cursor.fetchone()[0]
     finally:
         cursor.close()
         conn.close()
 
 
+class EmailQueue:
+    SEND_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf"))
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._tasks: list[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self.depth = 0
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self._send_buckets = [0] * len(self.SEND_BUCKETS)
+        self._send_sum = 0.0
+        self._send_count = 0
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._depth_loop()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def notify(self):
+        """Thread-safe; wakes idle workers after a handler committed new outbox rows."""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def _observe_send(self, seconds: float):
+        for i, bound in enumerate(self.SEND_BUCKETS):
+            if seconds <= bound:
+                self._send_buckets[i] += 1
+                break
+        self._send_sum += seconds
+        self._send_count += 1
+
+    async def _worker(self):
+        while True:
+            try:
+                job = await anyio.to_thread.run_sync(claim_email)
+                if job is None:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=EMAIL_POLL_INTERVAL)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                started = time.perf_counter()
+                error = None
+                try:
+                    await anyio.to_thread.run_sync(mailer.send, job["recipient"], job["template"], job["params"])
+                except Exception as e:
+                    error = str(e) or type(e).__name__
+                self._observe_send(time.perf_counter() - started)
+                if error is None:
+                    self.sent += 1
+                elif job["attempts"] >= EMAIL_MAX_ATTEMPTS:
+                    self.failed += 1
+                    logger.warning("email %s to %s failed permanently: %s", job["id"], job["recipient"], error)
+                else:
+                    self.retried += 1
+                await anyio.to_thread.run_sync(finish_email, job, error)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("email worker failed: %s", e)
+                await asyncio.sleep(EMAIL_POLL_INTERVAL)
+
+    async def _depth_loop(self):
+        # Counted on its own timer: workers never go idle while the queue is backed up
+        while True:
+            try:
+                self.depth = await anyio.to_thread.run_sync(count_pending_emails)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("email queue depth count failed: %s", e)
+            await asyncio.sleep(EMAIL_POLL_INTERVAL)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "pending": self.depth,
+            "sent": self.sent,
+            "retried": self.retried,
+            "failed": self.failed,
+            "send_seconds": {
+                "buckets": {
+                    ("+Inf" if bound == float("inf") else str(bound)): count
+                    for bound, count in zip(self.SEND_BUCKETS, self._send_buckets)
+                },
+                "sum": self._send_sum,
+                "count": self._send_count,
+            },
+        }
+
+
+email_queue = EmailQueue(EMAIL_WORKERS)
+
+@app.on_event("startup")
+async def start_email_queue():
+    mailer.check_configured()
+    await email_queue.start()
+
+@app.on_event("shutdown")
+async def stop_email_queue():
+    await email_queue.stop()
+
 @app.post("/send-verification")
-def send_verification_email(current_user: UserInDB = Depends(get_current_active_user)):
+def send_verification_email(
+    current_user: UserInDB = Depends(get_current_active_user),
+    conn: PooledConnection = Depends(get_db)
+):
+    cursor = conn.cursor(dictionary=True)
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
         # Check if a recent token exists
         cursor.execute(
             "SELECT email_verification_token, token_created_at FROM users WHERE id = %s",
@@ -1495,58 +3225,28 @@ def send_verification_email(current_user: UserInDB = Depends(get_current_active_
                 "UPDATE users SET email_verification_token = %s, token_created_at = NOW() WHERE id = %s",
                 (token, current_user.id)
             )
-            conn.commit()
-        
-    finally:
-        cursor.close()
-        conn.close()
 
-    try:
-        resend.Emails.send(
-            {
-                "from": "Infizity <info@infizity.com>",
-                "to": [current_user.email],
-                "subject": "Потвърдете вашия имейл",  # "Verify your email" in Bulgarian
-                "html": f"""
-                <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
-                    <h2 style="color: #2563eb;">Потвърждение на имейл адрес</h2>
-                    <p>Моля, кликнете на линка по-долу, за да потвърдите вашия имейл адрес:</p>
-                    <a
-                        href="{VERIFICATION_LINK_BASE}?email={current_user.email}&token={token}"
-                        style="
-                            display: inline-block;
-                            margin: 16px 0;
-                            padding: 12px 24px;
-                            background-color: #2563eb;
-                            color: white;
-                            text-decoration: none;
-                            border-radius: 4px;
-                            font-weight: bold;
-                        "
-                    >
-                        Потвърди имейл
-                    </a>
-                    <p>Ако не сте поискали това потвърждение, моля игнорирайте този имейл.</p>
-                    <p style="margin-top: 24px; color: #6b7280; font-size: 14px;">
-                        С уважение,<br>
-                        Екипът на Infizity
-                    </p>
-                </div>
-                """,
-            }
-        )        
-    except Exception as e:
+        # Sent in the background; the token and the outbox row commit together
+        queue_email(cursor, current_user.email, "verification", {
+            "link": f"{VERIFICATION_LINK_BASE}?email={current_user.email}&token={token}"
+        })
+        conn.commit()
+    except Error as e:
+        conn.rollback()
         raise HTTPException(status_code=500, detail=f"Email send failed: {str(e)}")
+    finally:
+        cursor.close()
 
+    email_queue.notify()
     return {"message": "Verification email sent."}
 
 @app.get("/verify-email")
 def verify_email(
     email: str = Query(..., description="Email address"),
     token: str = Query(..., description="Email verification token"),
+    conn: PooledConnection = Depends(get_db)
 ):
     try:
-        conn = get_db_connection()
         cursor = conn.cursor(dictionary=True)
         
         # First check if user is already verified
@@ -1572,18 +3272,21 @@ def verify_email(
             (user['id'],)
         )
         conn.commit()
+        publish_user_changed(user['id'])
+        if user['user_type'] == 'tutor':
+            publish_tutor_changed(user['id'])
         return {"message": "Email verified successfully."}
     except Error as e:
         conn.rollback()
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         cursor.close()
-        conn.close()
 
 @app.post("/update-price")
 def update_price(
     hourly_rate: int,
-    current_user: UserInDB = Depends(get_current_active_user)
+    current_user: UserInDB = Depends(get_current_active_user),
+    conn: PooledConnection = Depends(get_db)
 ):
     if current_user.user_type != "tutor":
         raise HTTPException(status_code=403, detail="Only tutors can update their price")
@@ -1591,7 +3294,6 @@ def update_price(
     if hourly_rate < 0:
         raise HTTPException(status_code=400, detail="Hourly rate must be a positive number")
 
-    conn = get_db_connection()
     cursor = conn.cursor()
 
     try:
@@ -1600,10 +3302,44 @@ def update_price(
             (float(hourly_rate), current_user.id)
         )
         conn.commit()
+        publish_user_changed(current_user.id)
         return {"message": "Price updated successfully"}
     except Error as e:
         conn.rollback()
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         cursor.close()
-        conn.close()
\ No newline at end of file
+
+STATS_TOKEN = os.getenv("STATS_TOKEN", "")  # bearer token for /stats and /metrics; unset disables both
+
+def require_stats_token(authorization: Optional[str] = Header(None)):
+    """Operational endpoints are for the Prometheus scraper and admins only."""
+    expected = f"Bearer {STATS_TOKEN}".encode()
+    if not STATS_TOKEN or not secrets.compare_digest((authorization or "").encode(), expected):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+@app.get("/metrics", include_in_schema=False, dependencies=[Depends(require_stats_token)])
+async def get_metrics():
+    body, content_type = metrics.render()
+    return Response(body, media_type=content_type)
+
+@app.get("/stats", dependencies=[Depends(require_stats_token)])
+async def get_stats():
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    return {
+        "db_pool": db_pool.stats(),
+        "user_cache": user_cache.stats(),
+        "password_hasher": password_hasher.stats(),
+        "avatar_renderer": avatar_renderer.stats(),
+        "websockets": manager.stats(),
+        "tutor_search_index": tutor_search_index.stats(),
+        "lesson_expiry": lesson_expiry.stats(),
+        "lesson_cache": lesson_cache.stats(),
+        "jitsi_tokens": jitsi_tokens.stats(),
+        "email_queue": email_queue.stats(),
+        "worker_threads": {"total": limiter.total_tokens, "busy": limiter.borrowed_tokens},
+    }
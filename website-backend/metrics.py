@@ -0,0 +1,67 @@
+"""Prometheus metrics exported at GET /metrics.
+
+Request metrics are recorded by a middleware in main.py, query timings by
+the cursors PooledConnection hands out and WebSocket metrics by
+ConnectionManager. With several uvicorn workers, point
+PROMETHEUS_MULTIPROC_DIR at an empty directory so every worker's samples
+are aggregated into one scrape.
+"""
+import os
+import re
+from functools import lru_cache
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client import multiprocess
+
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Time until the response starts, by route template",
+    ["method", "route"],
+)
+REQUESTS = Counter("http_requests", "Completed requests", ["method", "route", "status"])
+IN_FLIGHT = Gauge("http_requests_in_flight", "Requests being handled", multiprocess_mode="livesum")
+
+DB_QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds", "Statement execution time, by verb and first table",
+    ["statement"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 10.0),
+)
+
+WS_CONNECTIONS = Gauge("websocket_connections", "Open WebSocket connections", multiprocess_mode="livesum")
+WS_DELIVERIES = Counter("websocket_deliveries", "Pub/sub messages delivered to this worker", ["channel"])
+WS_FANOUT = Counter("websocket_fanout", "Socket sends queued by fan-out of delivered messages", ["channel"])
+WS_SENT = Counter("websocket_messages_sent", "Messages written to sockets")
+WS_DROPPED = Counter("websocket_messages_dropped", "Queued messages discarded with an evicted socket")
+WS_EVICTIONS = Counter("websocket_evictions", "Sockets closed by the server", ["reason"])
+
+# First table a statement touches; SELECTs are attributed to their FROM table
+_TABLE = re.compile(r"\b(?:FROM|INTO|UPDATE|TABLE)\s+`?(\w+)", re.IGNORECASE)
+
+
+@lru_cache(maxsize=1024)
+def statement_label(sql: str) -> str:
+    """'select bookings', 'update users', ...: one series per verb and table, not per query text."""
+    words = sql.split(None, 1)
+    verb = words[0].lower() if words else ""
+    match = _TABLE.search(sql)
+    return f"{verb} {match.group(1).lower()}" if match else verb
+
+
+def observe_query(sql: str, seconds: float):
+    DB_QUERY_LATENCY.labels(statement_label(sql)).observe(seconds)
+
+
+def render() -> tuple[bytes, str]:
+    """Exposition body and content type for /metrics."""
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+def worker_exited():
+    """Drops this worker's live gauges from the multiprocess aggregate."""
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(os.getpid())
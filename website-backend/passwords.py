@@ -0,0 +1,25 @@
+"""bcrypt helpers run by the password process pool's workers (procpool.py)."""
+import os
+from passlib.context import CryptContext
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+# min/max equal to the default makes passlib flag any hash with a different
+# cost as needing an update, so changing BCRYPT_ROUNDS rehashes on next login.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+
+def hash_password(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def verify_and_update(plain_password: str, hashed_password: str):
+    """Returns (is_valid, new_hash_or_None)."""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
@@ -0,0 +1,68 @@
+"""Bounded process pools for CPU-bound work (bcrypt, image decoding).
+
+Work runs in spawned processes so it never blocks the event loop, and a
+pool answers 429 instead of queueing without bound. Workers import this
+module and the module of the submitted function, never main.py, so keep
+app imports out of both.
+"""
+import asyncio
+import importlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from fastapi import HTTPException, status
+
+
+def warm_up(module: str) -> bool:
+    """Imports module in a fresh worker, so the first real call does not pay for it."""
+    importlib.import_module(module)
+    return True
+
+
+class ProcessPool:
+    def __init__(self, module: str, workers: int, max_pending: int, busy_detail: str):
+        self.module = module
+        self.workers = workers
+        self.max_pending = max_pending
+        self.busy_detail = busy_detail
+        self.pending = 0
+        self.rejected = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def start(self):
+        # spawn, not fork: the parent already runs DB and anyio threads
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        for _ in range(self.workers):
+            self._executor.submit(warm_up, self.module)
+
+    def shutdown(self):
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def run(self, fn, *args):
+        """Result of fn(*args) from a worker; 429 while max_pending calls are in flight."""
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=self.busy_detail,
+                headers={"Retry-After": "1"},
+            )
+        self.pending += 1
+        try:
+            return await asyncio.wrap_future(self._executor.submit(fn, *args))
+        finally:
+            self.pending -= 1
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "rejected": self.rejected,
+        }
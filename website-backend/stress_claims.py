@@ -0,0 +1,132 @@
+"""Concurrent booking claims against one tutor: checks for double bookings and measures throughput.
+
+Every thread claims random slot ranges of the same tutor with
+availability.claim, each in its own transaction, the way book_lesson does.
+Afterwards the successful claims must be pairwise disjoint and add up to the
+tutor's booked mask. Exits non-zero on any double booking.
+
+Use a test tutor: its masks are overwritten for the run (everything offered,
+nothing booked) and restored afterwards.
+
+    python stress_claims.py --tutor-id 42 --threads 16 --claims 200
+"""
+import argparse
+import random
+import sys
+import threading
+import time
+import mysql.connector
+from mysql.connector import errorcode
+
+import availability
+from DB_checker import DB_CONFIG
+
+RETRY_ERRORS = (errorcode.ER_LOCK_DEADLOCK, errorcode.ER_LOCK_WAIT_TIMEOUT)
+
+
+def random_range(rng: random.Random, max_length: int) -> tuple[int, int, int]:
+    length = rng.randint(1, max_length)
+    return rng.randrange(availability.DAYS), rng.randint(0, availability.SLOTS_PER_DAY - length), length
+
+
+def worker(tutor_id: int, claims: int, max_length: int, seed: int, results: dict, lock: threading.Lock):
+    rng = random.Random(seed)
+    conn = mysql.connector.connect(**DB_CONFIG)
+    cursor = conn.cursor()
+    won, rejected, retried = [], 0, 0
+    try:
+        for _ in range(claims):
+            mask = availability.WeeklyBitmap.from_range(*random_range(rng, max_length))
+            try:
+                claimed = availability.claim(cursor, tutor_id, mask)
+                conn.commit()
+            except mysql.connector.Error as e:
+                conn.rollback()
+                if e.errno not in RETRY_ERRORS:
+                    raise
+                retried += 1
+                continue
+            if claimed:
+                won.append(mask)
+            else:
+                rejected += 1
+    finally:
+        cursor.close()
+        conn.close()
+    with lock:
+        results["won"] += won
+        results["rejected"] += rejected
+        results["retried"] += retried
+
+
+def run(tutor_id: int, threads: int, claims: int, max_length: int, seed: int) -> bool:
+    conn = mysql.connector.connect(**DB_CONFIG)
+    cursor = conn.cursor()
+    original = None
+    try:
+        cursor.execute(
+            "SELECT offered, booked FROM tutor_week_availability WHERE tutor_id = %s", (tutor_id,)
+        )
+        original = cursor.fetchone()
+        cursor.execute("""
+            INSERT INTO tutor_week_availability (tutor_id, offered, booked)
+            VALUES (%s, UNHEX(%s), UNHEX(%s))
+            ON DUPLICATE KEY UPDATE offered = VALUES(offered), booked = VALUES(booked), version = version + 1
+        """, (tutor_id, availability.WeeklyBitmap(availability.FULL_WEEK).to_hex(), availability.ZERO_HEX))
+        conn.commit()
+
+        results = {"won": [], "rejected": 0, "retried": 0}
+        lock = threading.Lock()
+        pool = [
+            threading.Thread(target=worker, args=(tutor_id, claims, max_length, seed + i, results, lock))
+            for i in range(threads)
+        ]
+        started = time.perf_counter()
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        _, booked = availability.load_masks(cursor, tutor_id)
+        conn.commit()
+        union = availability.WeeklyBitmap()
+        overlaps = 0
+        for mask in results["won"]:
+            if union.overlaps(mask):
+                overlaps += 1
+            union.set(mask)
+        attempts = len(results["won"]) + results["rejected"] + results["retried"]
+        print(
+            f"{attempts} claims in {elapsed:.2f}s ({attempts / elapsed:.0f}/s) over {threads} threads: "
+            f"{len(results['won'])} won, {results['rejected']} rejected, {results['retried']} deadlock retries"
+        )
+        print(f"double bookings: {overlaps}, booked mask matches claims: {booked.bits == union.bits}")
+        return overlaps == 0 and booked.bits == union.bits
+    finally:
+        if original:
+            cursor.execute(
+                "UPDATE tutor_week_availability SET offered = %s, booked = %s, version = version + 1 WHERE tutor_id = %s",
+                (original[0], original[1], tutor_id)
+            )
+        else:
+            cursor.execute("DELETE FROM tutor_week_availability WHERE tutor_id = %s", (tutor_id,))
+        conn.commit()
+        cursor.close()
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent claim stress test for availability masks")
+    parser.add_argument("--tutor-id", type=int, required=True, help="a test tutor; its masks are restored afterwards")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--claims", type=int, default=200, help="claims per thread")
+    parser.add_argument("--max-length", type=int, default=4, help="longest claimed range in 30-minute slots")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    ok = run(args.tutor_id, args.threads, args.claims, args.max_length, args.seed)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
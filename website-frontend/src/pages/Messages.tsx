@@ -5,6 +5,7 @@ import { useNavigate } from 'react-router-dom';
 // Helper function for authenticated fetch requests
 const API_URL = import.meta.env.VITE_API_URL;
 const WEBSOCKET_URL = import.meta.env.VITE_WEBSOCKET_URL;
+const MESSAGES_PAGE_SIZE = 50;
 const authenticatedFetch = async (url: string, options: RequestInit = {}, navigate: any) => {
   const token = localStorage.getItem('token');
   if (!token) {
@@ -169,7 +170,10 @@ function Messages() {
     ws.onmessage = (event) => {
       try {
         const data = JSON.parse(event.data);
-        if (data.type === 'new_message') {
+        if (data.type === 'ping') {
+          // Server heartbeat; sockets that stay silent get closed
+          ws.send(JSON.stringify({ type: 'pong' }));
+        } else if (data.type === 'new_message') {
           const { conversation_id, message } = data;
           setSelectedConversation(prev => prev?.id === conversation_id ? { ...prev, messages: [...prev.messages, message], } : prev);
           setConversations(prevConvs => prevConvs.map(conv => conv.id === conversation_id ? { ...conv, last_message_content: message.content, last_message_time: message.sent_at, unread_count: selectedConversation?.id === conv.id ? 0 : (conv.unread_count || 0) + 1, } : conv));
@@ -199,14 +203,16 @@ function Messages() {
 
   const handleSelectConversation = async (conv) => {
     try {
-      const response = await authenticatedFetch(`${API_URL}/conversations/${conv.id}/messages`, { method: 'GET' }, navigate);
+      const response = await authenticatedFetch(`${API_URL}/conversations/${conv.id}/messages?limit=${MESSAGES_PAGE_SIZE}`, { method: 'GET' }, navigate);
       const messages = await response.json();
-      setSelectedConversation({ ...conv, messages });
+      setSelectedConversation({ ...conv, messages, hasMore: messages.length === MESSAGES_PAGE_SIZE });
 
-      // Mark as read on the server
-      try {
-          await authenticatedFetch(`${API_URL}/conversations/${conv.id}/read`, { method: 'POST' }, navigate);
-      } catch (readError) { console.error('Error marking conversation as read:', readError); }
+      // Mark as read on the server, up to the newest message we actually showed
+      if (messages.length > 0) {
+        try {
+            await authenticatedFetch(`${API_URL}/conversations/${conv.id}/read?up_to_id=${messages[messages.length - 1].id}`, { method: 'POST' }, navigate);
+        } catch (readError) { console.error('Error marking conversation as read:', readError); }
+      }
 
       // Mark as read in the state immediately
       setConversations(prevConvs => prevConvs.map(c => c.id === conv.id ? { ...c, unread_count: 0 } : c));
@@ -217,6 +223,18 @@ function Messages() {
     }
   };
 
+  const handleLoadEarlier = async () => {
+    if (!selectedConversation?.messages?.length) return;
+    const oldestId = selectedConversation.messages[0].id;
+    try {
+      const response = await authenticatedFetch(`${API_URL}/conversations/${selectedConversation.id}/messages?before_id=${oldestId}&limit=${MESSAGES_PAGE_SIZE}`, { method: 'GET' }, navigate);
+      const older = await response.json();
+      setSelectedConversation(prev => ({ ...prev, messages: [...older, ...prev.messages], hasMore: older.length === MESSAGES_PAGE_SIZE }));
+    } catch (error) {
+      console.error('Error fetching earlier messages:', error);
+    }
+  };
+
   const handleSendMessage = async (e) => {
     e.preventDefault();
     if (!newMessage.trim() || !selectedConversation) return;
@@ -307,6 +325,11 @@ function Messages() {
 
                 {/* Message List */}
                 <div className="flex-1 overflow-y-auto p-4 space-y-4 bg-gray-50">
+                  {selectedConversation.hasMore && (
+                    <div className="flex justify-center">
+                      <button onClick={handleLoadEarlier} className="text-sm text-blue-600 hover:underline">Load earlier messages</button>
+                    </div>
+                  )}
                   {selectedConversation.messages && selectedConversation.messages.length === 0 ? (
                     <div className="flex items-center justify-center h-full text-gray-500">Start a new conversation</div>
                   ) : (
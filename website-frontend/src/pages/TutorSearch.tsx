@@ -11,6 +11,7 @@ function TutorSearch() {
   const [isFiltersOpen, setIsFiltersOpen] = useState(false);
   const [subjects, setSubjects] = useState([]);
   const [tutors, setTutors] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [isLoading, setIsLoading] = useState(false);
   const [error, setError] = useState(null);
 
@@ -36,9 +37,8 @@ function TutorSearch() {
     fetchSubjects();
   }, []);
 
-  // Fetch tutors whenever filters change
-  useEffect(() => {
-    const fetchTutors = () => {
+  // Fetch tutors whenever filters change; pageCursor appends the next page
+  const fetchTutors = (pageCursor = null) => {
       setIsLoading(true);
       setError(null);
 
@@ -47,6 +47,7 @@ function TutorSearch() {
       if (searchTerm) params.append('search_term', searchTerm);
       if (selectedSubject) params.append('subject', selectedSubject);
       params.append('max_price', priceRange);
+      if (pageCursor) params.append('cursor', pageCursor);
 
       const token = localStorage.getItem('token');
       console.log("Token:", token); // Debugging line to check token value
@@ -74,10 +75,11 @@ function TutorSearch() {
           if (!response.ok) {
             throw new Error('Failed to fetch tutors');
           }
-          return response.json();
+          return Promise.all([response.json(), response.headers.get('X-Next-Cursor')]);
         })
-        .then((data) => {
-          setTutors(data);
+        .then(([data, cursor]) => {
+          setTutors((prev) => (pageCursor ? [...prev, ...data] : data));
+          setNextCursor(cursor);
         })
         .catch((err) => {
           // If the error was the auth error, navigate already handled it
@@ -88,8 +90,9 @@ function TutorSearch() {
         .finally(() => {
           setIsLoading(false);
         });
-    };
+  };
 
+  useEffect(() => {
     // Add a small debounce to prevent too many requests while typing
     const timer = setTimeout(() => {
       fetchTutors();
@@ -207,6 +210,7 @@ function TutorSearch() {
 
         {/* Results */}
         {!isLoading && !error && (
+          <>
           <div className="grid grid-cols-1 md:grid-cols-2 gap-6">
             {tutors.length > 0 ? (
               tutors.map((tutor) => (
@@ -244,6 +248,14 @@ function TutorSearch() {
               </div>
             )}
           </div>
+          {nextCursor && (
+            <div className="flex justify-center mt-6">
+              <button onClick={() => fetchTutors(nextCursor)} className="px-4 py-2 border border-gray-300 rounded-lg text-gray-700 hover:bg-gray-50">
+                Зареди още
+              </button>
+            </div>
+          )}
+          </>
         )}
       </div>
   );